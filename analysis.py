@@ -0,0 +1,147 @@
+import os
+import glob
+import time
+import optparse
+
+import numpy as np
+import pandas as pd
+
+# post-processing of the per-step files of runner.algorithm() / runner.fixed() / network.control()
+# (csv, npy or parquet, see metrics.py), instead of the .xlsx workbooks.
+#
+# every file becomes rows of one long table with the same columns (SCHEMA, a column a file doesn't
+# have is nan, e.g. collisions for dataalgo) and a "run" column with the file name. all the KPIs
+# are groupby / rolling over that table, no python loop over runs or steps, so a few hundred
+# sweep outputs take seconds:
+#   summary  per run: mean / p95 waiting time and queue length, vehicles out, per hour
+#   windows  per run and --window seconds: mean waiting time, queue length, vehicles out
+#   rolling  per run: peak of the --window seconds rolling mean of the waiting time and queue length
+#   phases   per run and phase: seconds in it, vehicles out during it and per second
+#   greens   per run and phase: how many times a phase lasted how long (histogram over BINS)
+#
+# python analysis.py results/dataalgo.csv results/datafixed.csv --window 300
+# python analysis.py "results/sweep/*.csv" --output results/report
+
+SCHEMA = ["time", "waiting time", "queue length", "departure rate", "collisions", "phase", "decisions"]
+BINS = [0, 5, 10, 20, 30, 47, 60, 90, 120, np.inf]
+
+
+def load_run(path):
+    # one per-step file as a DataFrame with the SCHEMA columns
+    extension = os.path.splitext(path)[1]
+    if extension == ".npy":
+        df = pd.DataFrame(np.load(path))
+    elif extension == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, dtype=float)
+    return df.reindex(columns=SCHEMA)
+
+
+def per_step(path):
+    # the files metrics.Metrics writes start with a time column, *ave.csv, sweep.csv etc. don't
+    if path.endswith("ave.csv"):
+        return False
+    if path.endswith(".csv"):
+        with open(path) as f:
+            return f.readline().startswith("time,")
+    return path.endswith(".npy") or path.endswith(".parquet")
+
+
+def load_runs(patterns):
+    # every per-step file matching the patterns (globs or paths) in one table, run is the file name
+    paths = sorted(set(path for pattern in patterns for path in glob.glob(pattern)))
+    paths = [path for path in paths if per_step(path)]
+    if not paths:
+        raise ValueError("no per-step result files in {0}".format(patterns))
+    tables = [load_run(path) for path in paths]
+    runs = pd.concat(tables, ignore_index=True)
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    runs.insert(0, "run", pd.Categorical(np.repeat(names, [len(table) for table in tables]), categories=names))
+    return runs
+
+
+def summary(runs):
+    grouped = runs.groupby("run", observed=True)
+    table = grouped.agg(**{
+        "steps": ("time", "size"),
+        "mean waiting time": ("waiting time", "mean"),
+        "p95 waiting time": ("waiting time", lambda values: values.quantile(0.95)),
+        "mean queue length": ("queue length", "mean"),
+        "p95 queue length": ("queue length", lambda values: values.quantile(0.95)),
+        "vehicles out": ("departure rate", "sum"),
+        "collisions": ("collisions", lambda values: values.sum(min_count=1)),    # nan, not 0, without collision data
+    })
+    table["vehicles out per hour"] = table["vehicles out"] / table["steps"] * 3600
+    return table
+
+
+def windows(runs, window=300):
+    window_start = (runs["time"] // window * window).rename("window")
+    return runs.groupby([runs["run"], window_start], observed=True).agg(**{
+        "waiting time": ("waiting time", "mean"),
+        "queue length": ("queue length", "mean"),
+        "vehicles out": ("departure rate", "sum"),
+    })
+
+
+def rolling(runs, window=300):
+    # peak of the rolling means, the worst stretch of every run
+    means = runs.groupby("run", observed=True)[["waiting time", "queue length"]].rolling(window, min_periods=1).mean()
+    peaks = means.groupby(level="run", observed=True).max()
+    return peaks.add_prefix("peak {0}s ".format(window))
+
+
+def phase_spells(runs):
+    # one row per stretch of steps in the same phase: run, phase, length (steps)
+    run_codes = runs["run"].cat.codes.to_numpy()
+    phase = runs["phase"].to_numpy()
+    start = np.ones(len(runs), dtype=bool)
+    start[1:] = (phase[1:] != phase[:-1]) | (run_codes[1:] != run_codes[:-1])
+    first = np.flatnonzero(start)
+    lengths = np.diff(np.append(first, len(runs)))
+    return pd.DataFrame({"run": runs["run"].to_numpy()[first], "phase": phase[first], "length": lengths})
+
+
+def phases(runs):
+    table = runs.groupby(["run", "phase"], observed=True).agg(**{
+        "seconds": ("time", "size"),
+        "vehicles out": ("departure rate", "sum"),
+    })
+    table["vehicles out per second"] = table["vehicles out"] / table["seconds"]
+    return table
+
+
+def greens(runs, bins=BINS):
+    # histogram of the phase lengths, the first and last spell of a run are cut by the run so they count too
+    spells = phase_spells(runs.dropna(subset=["phase"]))
+    spells["length"] = pd.cut(spells["length"], bins, right=False)
+    return spells.groupby(["run", "phase", "length"], observed=True).size().unstack("length", fill_value=0)
+
+
+def report(runs, window=300, output="results/report"):
+    # the tables as <output>_<name>.csv and all of them in <output>.txt, returns the summary
+    table = summary(runs).join(rolling(runs, window))
+    tables = [("summary", table), ("windows", windows(runs, window)), ("phases", phases(runs)), ("greens", greens(runs))]
+    if output is not None:
+        directory = os.path.dirname(output)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(output + ".txt", 'w') as f:
+            for name, values in tables:
+                values.to_csv("{0}_{1}.csv".format(output, name))
+                f.write("{0}\n{1}\n\n".format(name, values.to_string(float_format="{0:.3f}".format)))
+    return table
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser(usage="%prog [options] files or globs (default results/data*)")
+    optParser.add_option("--window", type="int", default=300, help="seconds per window / rolling mean")
+    optParser.add_option("--output", default="results/report", help="report file names, without extension")
+    options, args = optParser.parse_args()
+
+    start = time.perf_counter()
+    runs = load_runs(args or ["results/data*"])
+    table = report(runs, options.window, options.output)
+    print(table.to_string(float_format="{0:.3f}".format))
+    print("{0} runs, {1} steps in {2:.2f} s".format(runs["run"].nunique(), len(runs), time.perf_counter() - start))
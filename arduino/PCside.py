@@ -2,32 +2,75 @@ import serial
 import random
 import time
 
+import protocol
+
 random.seed(time.time())
 
-port = serial.Serial(port = "COM4", baudrate = 9600, bytesize = 8, timeout = 1, stopbits = serial.STOPBITS_ONE)
+# binary = True talks the frames of protocol.py with code.py (binaryProtocol = True). Those go over the
+# board's data port, the second COM port it shows up as once boot.py is on the board.
+# binary = False is the old text link on the console port: hex lines in, CSV lines out.
+binary = True
+portName = "COM5" if binary else "COM4"
+
+port = serial.Serial(port = portName, baudrate = 9600, bytesize = 8, timeout = 1, stopbits = serial.STOPBITS_ONE)
 outFile = "C:\\usr\\src\\output.txt"
 
+def randomActors():
+    # Zero to two random actors, as 9-bit lane masks
+    return [random.randint(1, 511) for i in range(random.randint(0, 2))]
+
+def tickLine(payload):
+    # Same CSV line code.py prints in text mode, so output.txt looks the same either way
+    now, phase, countdown, lanes = protocol.unpackTick(payload)
+    line = "{0}, {1}, {2}, ".format(now, phase, countdown)
+    for length, wait in lanes:
+        line += "{0}, {1}, ".format(length, wait)
+    return line + "-\n"
+
 port.flush()
 
+reader = protocol.Reader()
+sequence = 0    # Of the injection frames
+
 with open(outFile, "w") as f:
     while True:
         try:
-            data = port.readline().decode("utf-8")
-            print(data, end="")
-            f.write(data)
-            
-            # Add zero to two random actors after a cycle
-            if data.startswith("-"):
-                count = random.randint(0, 2)
-                while count > 0:
-                    out = hex(random.randint(1, 511))[2:] + "\n"
-                    print("PC >>> {0}".format(out))
-                    port.write(out.encode("utf-8"))
-                    count -= 1
-                    time.sleep(0.15)
+            if binary:
+                dropped = reader.dropped
+                for kind, tickSequence, payload in reader.feed(port.read(port.in_waiting or 1)):
+                    if kind != protocol.TICK:
+                        continue
+
+                    data = tickLine(payload)
+                    print(data, end="")
+                    f.write(data)
+
+                    # Add the actors for this cycle, in as few frames as fit them
+                    masks = randomActors()
+                    if masks:
+                        print("PC >>> {0}".format(", ".join(hex(mask)[2:] for mask in masks)))
+                        port.write(protocol.packInject(sequence, masks))
+                        sequence = (sequence + protocol.injectFrames(masks)) & 0xFF
+
+                if reader.dropped != dropped:
+                    print("PC !!! {0} tick frames lost, {1} bad".format(reader.dropped, reader.errors))
+
+            else:
+                data = port.readline().decode("utf-8")
+                print(data, end="")
+                f.write(data)
+
+                # Add zero to two random actors after a cycle, in one write (code.py splits on every newline)
+                if data.startswith("-") or data.endswith("-\n"):
+                    out = "".join(hex(mask)[2:] + "\n" for mask in randomActors())
+                    if out:
+                        print("PC >>> {0}".format(out))
+                        port.write(out.encode("utf-8"))
 
 
         except KeyboardInterrupt:
             break
 
-port.close()
\ No newline at end of file
+if binary:
+    print("PC: {0} tick frames lost, {1} bad".format(reader.dropped, reader.errors))
+port.close()
@@ -0,0 +1,133 @@
+import sys
+import time
+import types
+import random
+import asyncio
+import optparse
+
+# Runs a copy of code.py on the PC, with fake board modules, and measures the Junction.tick period
+# (mean, jitter) and how much CPU the whole program burns while it waits.
+# Inputs are random: pin presses and hex lines on the serial port at about --rate actors per second.
+#
+#   python bench_ticks.py code.py
+#   python bench_ticks.py old_code.py --interval 0.05 --seconds 10
+
+class Event:
+    def __init__(self, key_number):
+        self.key_number = key_number
+        self.pressed = True
+
+class Queue:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def get(self):
+        if random.random() < self.keys.chance():
+            return Event(random.randrange(self.keys.count))
+        return None
+
+class Keys:
+    rate = 1.0
+
+    def __init__(self, pins, value_when_pressed=False):
+        self.count = len(pins)
+        self.events = Queue(self)
+        self.last = time.monotonic()
+
+    def chance(self):
+        # Probability that there is a new press since the last get(), about `rate` presses per second over all Keys
+        now = time.monotonic()
+        elapsed, self.last = now - self.last, now
+        return min(1.0, Keys.rate * elapsed * self.count / 9)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+class Console:
+    def __init__(self):
+        self.pending = b""
+        self.last = time.monotonic()
+
+    @property
+    def in_waiting(self):
+        now = time.monotonic()
+        if random.random() < Keys.rate * (now - self.last):
+            self.pending += (hex(random.randint(1, 511))[2:] + "\n").encode("utf-8")
+        self.last = now
+        return len(self.pending)
+
+    def read(self, count):
+        data, self.pending = self.pending[:count], self.pending[count:]
+        return data
+
+class Pixels(list):
+    def __init__(self, pin, count, pixel_order=None, auto_write=True):
+        super().__init__([None] * count)
+
+    def show(self):
+        pass
+
+def fakeModules():
+    board = types.ModuleType("board")
+    for number in range(60):
+        setattr(board, "D{0}".format(number), number)
+    neopixel = types.ModuleType("neopixel")
+    neopixel.RGB = "RGB"
+    neopixel.NeoPixel = Pixels
+    keypad = types.ModuleType("keypad")
+    keypad.Keys = Keys
+    usb_cdc = types.ModuleType("usb_cdc")
+    usb_cdc.console = Console()
+    usb_cdc.data = None     # Like a board without boot.py, code.py falls back to the text protocol
+    for module in (board, neopixel, keypad, usb_cdc, types.ModuleType("digitalio")):
+        sys.modules[module.__name__] = module
+
+def bench(path, interval, seconds):
+    fakeModules()
+    program = {"__name__": "code"}
+    run = asyncio.run
+    asyncio.run = lambda coroutine: coroutine.close()  # Just define everything, don't start it yet
+    exec(compile(open(path).read(), path, "exec"), program)
+    asyncio.run = run
+    program["timeInterval"] = interval
+
+    ticks = []
+    tick = program["Junction"].tick
+    def timedTick(self):
+        ticks.append(time.perf_counter())
+        tick(self)
+    program["Junction"].tick = timedTick
+
+    async def limited():
+        try:
+            await asyncio.wait_for(program["setup"](), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    stdout, sys.stdout = sys.stdout, open("/dev/null" if sys.platform != "win32" else "NUL", "w")
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    asyncio.run(limited())
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    sys.stdout = stdout
+
+    periods = [(b - a) * 1000 for a, b in zip(ticks, ticks[1:])]
+    mean = sum(periods) / len(periods)
+    deviation = (sum((period - mean) ** 2 for period in periods) / len(periods)) ** 0.5
+    drift = (ticks[-1] - ticks[0]) * 1000 - interval * 1000 * len(periods)
+    print("{0}: {1} ticks, period {2:.3f} ms (target {3:.0f}), jitter {4:.3f} ms, max {5:.3f} ms, drift {6:.1f} ms, cpu {7:.0f}%".format(
+        path, len(ticks), mean, interval * 1000, deviation, max(periods), drift, 100 * cpu / wall))
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser(usage="%prog [options] code.py")
+    optParser.add_option("--interval", type="float", default=0.1, help="timeInterval to run with (s)")
+    optParser.add_option("--seconds", type="float", default=10, help="how long to run")
+    optParser.add_option("--rate", type="float", default=1.0, help="actors per second on the pins and on the serial port")
+    options, args = optParser.parse_args()
+    Keys.rate = options.rate
+    random.seed(1)
+    bench(args[0] if args else "code.py", options.interval, options.seconds)
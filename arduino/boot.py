@@ -0,0 +1,6 @@
+# Runs before code.py. Turns on the second USB serial port (usb_cdc.data) for the binary protocol
+# with PCside.py (see protocol.py), the console stays for the REPL and prints.
+# Changes here only take effect after a hard reset of the board.
+import usb_cdc
+
+usb_cdc.enable(console = True, data = True)
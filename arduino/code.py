@@ -6,9 +6,17 @@ import asyncio
 import digitalio
 import keypad
 import usb_cdc
+import protocol
 
 # "Simulation" time granularity
 timeInterval = 1.0
+
+# Sleep of the input task when nothing is coming in, doubles from min to max while idle (seconds)
+idleSleepMin = 0.001
+idleSleepMax = 0.02
+
+# Print "J, count, mean, std, min, max" of the tick period (ms) every 60 ticks
+measureJitter = False
 travelTicksCar = 3   # How many ticks for a car to get popped from the queue
 travelTicksPed = 5   # How many ticks for a pedestrian to cross 4 lanes
 
@@ -23,19 +31,92 @@ colorRed = (0, 10, 0)
 colorOrange = (6, 10, 0)
 colorGreen = (10, 0, 2)
 
+# Serial link with PCside.py. With binaryProtocol the frames of protocol.py go over the usb_cdc data port
+# (enabled in boot.py), so binary bytes never reach the REPL, which would take a 0x03 as Ctrl-C.
+# Without it (or if boot.py didn't enable the data port) it's hex text lines in and CSV text out on the console.
+binaryProtocol = True
+if binaryProtocol and usb_cdc.data is None:
+    binaryProtocol = False
+serialPort = usb_cdc.data if binaryProtocol else usb_cdc.console
+
 # Factors for score calculation
 A = 2
 B = 2
 C = 1
 
 # Define the 16 WS2812 RGB modules connected to digital pin 52
-pixels = neopixel.NeoPixel(board.D52, 16, pixel_order=neopixel.RGB)
+# auto_write is off so a phase change is sent to the strip once, by pixels.show()
+pixels = neopixel.NeoPixel(board.D52, 16, pixel_order=neopixel.RGB, auto_write=False)
+
+# Lane states for each phase (0 = stop, 1 = go, 2 = caution), in the order of Junction.lanes:
+# mainLaneEW2, mainLaneEW1, mainLaneWE1, mainLaneWE2, subLaneS1, subLaneS2, pedLaneW, pedLaneE, pedLaneS
+phaseStates = (
+    (1, 1, 1, 1, 0, 0, 0, 0, 1),
+    (1, 1, 1, 1, 0, 0, 0, 0, 0),
+    (2, 2, 2, 2, 0, 0, 0, 0, 0),
+    (0, 0, 0, 0, 1, 1, 1, 1, 0),
+    (0, 0, 0, 0, 1, 1, 0, 0, 0),
+    (0, 0, 0, 0, 2, 2, 0, 0, 0),
+)
+
+# pixels[] indices, same lane order as above:
+# 0 is westbound, straight
+# 1 is westbound, straight and turn south
+# 2 is eastbound, straight
+# 3 is eastbound, straight and turn south
+# 4 is gap
+# 5 is pedestrian north-south, west-side
+# 6 is pedestrian north-south, east-side
+# 7 is gap
+# 8 is south road, westbound and eastbound
+# 9 is south road, eastbound
+# 10 is gap
+# 11 is pedestrian east-west, south-side
+lanePixels = (0, 1, 2, 3, 8, 9, 5, 6, 11)
+stateColors = (colorRed, colorGreen, colorOrange)
+
+# (pixel index, color) pairs to show for each phase
+phaseFrames = tuple(tuple((index, stateColors[state]) for index, state in zip(lanePixels, states)) for states in phaseStates)
+
+# FIFO of actor arrival timestamps, keeps the sum of the timestamps so the mean wait needs no loop.
+# Popping from the front only moves the head index (list.pop(0) shifts the whole list), the
+# list is compacted once more than half of it has been popped.
+class ActorQueue:
+    def __init__(self):
+        self.items = []
+        self.head = 0
+        self.total = 0      # Sum of the timestamps still in the queue
+
+    def __len__(self):
+        return len(self.items) - self.head
+
+    def __getitem__(self, index):
+        return self.items[self.head + index]
+
+    def append(self, timestamp):
+        self.items.append(timestamp)
+        self.total += timestamp
+
+    def popleft(self):
+        timestamp = self.items[self.head]
+        self.head += 1
+        self.total -= timestamp
+        if self.head > 16 and self.head * 2 > len(self.items):
+            self.items = self.items[self.head:]
+            self.head = 0
+        return timestamp
+
+    def pop(self, index):
+        # Removes an actor from the middle, only used by rebalanceLanes
+        timestamp = self.items.pop(self.head + index)
+        self.total -= timestamp
+        return timestamp
 
 # Contains the lane information, used for vehicles and pedestrians
 class Lane:
     def __init__(self, name, turnModulus, isPedXing):
         self.name = name
-        self.actorQueue = []
+        self.actorQueue = ActorQueue()
         self.hungerLevel = 0
         self.turnModulus = turnModulus  # Naive, modulus-based way to determine if this actor is going primary path (non-zero modulus) or turning (zero modulus)
         self.state = 0                  # 0 = stop, 1 = go, 2 = caution
@@ -51,13 +132,12 @@ class Lane:
     # Returns mean waiting time in seconds
     def waitingTime(self):
         # Avoid division by zero
-        if len(self.actorQueue) > 0:
+        count = len(self.actorQueue)
+        if count > 0:
             now = time.time()   # Time now
-            runningTotal = 0.0
-            for carTime in self.actorQueue:
-                runningTotal += now - carTime
-
-            return runningTotal / len(self.actorQueue)
+            # Same as the mean of (now - carTime), the subtraction is done in integers first
+            # because the timestamps are too big for the board's floats
+            return (now * count - self.actorQueue.total) / count
         
         else:
             # Empty queue: zero wait time
@@ -77,11 +157,11 @@ class Lane:
                         # If this actor is supposed to run (timestamp mod turnModulus > 0) and
                         #   the crossing queue is "cleared" in 2-ish ticks, let it cross
                         if (self.actorQueue[0] % self.turnModulus >= 0) and (time.time() % 2 == 0):
-                            self.actorQueue.pop(0)
+                            self.actorQueue.popleft()
                     
                     # Lane only has one direction allowed                
                     else:
-                        self.actorQueue.pop(0)
+                        self.actorQueue.popleft()
                         self.hungerLevel = 0
             else:
                 break
@@ -103,8 +183,13 @@ class Junction:
         self.pedLaneE = pedLaneE
         self.pedLaneS = pedLaneS
 
+        # Same order as the rows of phaseStates
+        self.lanes = (mainLaneEW2, mainLaneEW1, mainLaneWE1, mainLaneWE2, subLaneS1, subLaneS2, pedLaneW, pedLaneE, pedLaneS)
+        self.frame = [None] * 16    # Colors last written to pixels[]
+
         self.phase = 0
         self.changePhaseTimer = 30
+        self.sequence = 0           # Of the tick frames sent to PCside.py
 
     def setPhase(self, phase):
         # Sets the phase, triggers the lane settings, and sets the LEDs
@@ -112,237 +197,24 @@ class Junction:
             #print("***** setPhase {0} *****".format(phase))
             self.phase = phase
 
-            # pixels[] indices:
-            # 0 is westbound, straight
-            # 1 is westbound, straight and turn south
-            # 2 is eastbound, straight
-            # 3 is eastbound, straight and turn south
-            # 4 is gap
-            # 5 is pedestrian north-south, west-side
-            # 6 is pedestrian north-south, east-side
-            # 7 is gap
-            # 8 is south road, westbound and eastbound
-            # 9 is south road, eastbound
-            # 10 is gap
-            # 11 is pedestrian east-west, south-side
-
-            if phase == 0:
-                self.mainLaneEW2.state = 1
-                self.mainLaneEW2.hungerLevel = 0
-                pixels[0] = colorGreen
-
-                self.mainLaneEW1.state = 1
-                self.mainLaneEW1.hungerLevel = 0
-                pixels[1] = colorGreen
-
-                self.mainLaneWE1.state = 1
-                self.mainLaneWE1.hungerLevel = 0
-                pixels[2] = colorGreen
-
-                self.mainLaneWE2.state = 1
-                self.mainLaneWE2.hungerLevel = 0
-                pixels[3] = colorGreen
-
-                self.pedLaneW.state = 0
-                self.pedLaneW.hungerLevel += 1
-                pixels[5] = colorRed
-
-                self.pedLaneE.state = 0
-                self.pedLaneE.hungerLevel += 1
-                pixels[6] = colorRed
-
-                self.subLaneS1.state = 0
-                self.subLaneS1.hungerLevel += 1
-                self.subLaneS2.state = 0
-                self.subLaneS2.hungerLevel += 1
-                pixels[8] = colorRed
-                pixels[9] = colorRed
-
-                self.pedLaneS.state = 1
-                self.pedLaneS.hungerLevel = 0
-                pixels[11] = colorGreen
-
-            elif phase == 1:
-                self.mainLaneEW2.state = 1
-                self.mainLaneEW2.hungerLevel = 0
-                pixels[0] = colorGreen
-
-                self.mainLaneEW1.state = 1
-                self.mainLaneEW1.hungerLevel = 0
-                pixels[1] = colorGreen
-
-                self.mainLaneWE1.state = 1
-                self.mainLaneWE1.hungerLevel = 0
-                pixels[2] = colorGreen
-
-                self.mainLaneWE2.state = 1
-                self.mainLaneWE2.hungerLevel = 0
-                pixels[3] = colorGreen
-
-                self.pedLaneW.state = 0
-                self.pedLaneW.hungerLevel += 1
-                pixels[5] = colorRed
-
-                self.pedLaneE.state = 0
-                self.pedLaneE.hungerLevel += 1
-                pixels[6] = colorRed
-
-                self.subLaneS1.state = 0
-                self.subLaneS1.hungerLevel += 1
-                self.subLaneS2.state = 0
-                self.subLaneS2.hungerLevel += 1
-                pixels[8] = colorRed
-                pixels[9] = colorRed
-
-                self.pedLaneS.state = 0
-                self.pedLaneS.hungerLevel += 1
-                pixels[11] = colorRed
-
-            elif phase == 2:
-                self.mainLaneEW2.state = 2
-                self.mainLaneEW2.hungerLevel += 1
-                pixels[0] = colorOrange
-
-                self.mainLaneEW1.state = 2
-                self.mainLaneEW1.hungerLevel += 1
-                pixels[1] = colorOrange
-
-                self.mainLaneWE1.state = 2
-                self.mainLaneWE1.hungerLevel += 1
-                pixels[2] = colorOrange
-
-                self.mainLaneWE2.state = 2
-                self.mainLaneWE2.hungerLevel += 1
-                pixels[3] = colorOrange
-
-                self.pedLaneW.state = 0
-                self.pedLaneW.hungerLevel += 1
-                pixels[5] = colorRed
-
-                self.pedLaneE.state = 0
-                self.pedLaneE.hungerLevel += 1
-                pixels[6] = colorRed
-
-                self.subLaneS1.state = 0
-                self.subLaneS1.hungerLevel += 1
-                self.subLaneS2.state = 0
-                self.subLaneS2.hungerLevel += 1
-                pixels[8] = colorRed
-                pixels[9] = colorRed
-
-                self.pedLaneS.state = 0
-                self.pedLaneS.hungerLevel += 1
-                pixels[11] = colorRed
-
-            elif phase == 3:
-                self.mainLaneEW2.state = 0
-                self.mainLaneEW2.hungerLevel += 1
-                pixels[0] = colorRed
-
-                self.mainLaneEW1.state = 0
-                self.mainLaneEW1.hungerLevel += 1
-                pixels[1] = colorRed
-
-                self.mainLaneWE1.state = 0
-                self.mainLaneWE1.hungerLevel += 1
-                pixels[2] = colorRed
-
-                self.mainLaneWE2.state = 0
-                self.mainLaneWE2.hungerLevel += 1
-                pixels[3] = colorRed
-
-                self.pedLaneW.state = 1
-                self.pedLaneW.hungerLevel = 0
-                pixels[5] = colorGreen
-
-                self.pedLaneE.state = 1
-                self.pedLaneE.hungerLevel = 0
-                pixels[6] = colorGreen
-                
-                self.subLaneS1.state = 1
-                self.subLaneS1.hungerLevel = 0
-                self.subLaneS2.state = 1
-                self.subLaneS2.hungerLevel = 0
-                pixels[8] = colorGreen
-                pixels[9] = colorGreen
-
-                self.pedLaneS.state = 0
-                self.pedLaneS.hungerLevel += 1
-                pixels[11] = colorRed
-
-            elif phase == 4:
-                self.mainLaneEW2.state = 0
-                self.mainLaneEW2.hungerLevel += 1
-                pixels[0] = colorRed
-
-                self.mainLaneEW1.state = 0
-                self.mainLaneEW1.hungerLevel += 1
-                pixels[1] = colorRed
-
-                self.mainLaneWE1.state = 0
-                self.mainLaneWE1.hungerLevel += 1
-                pixels[2] = colorRed
-
-                self.mainLaneWE2.state = 0
-                self.mainLaneWE2.hungerLevel += 1
-                pixels[3] = colorRed
-
-                self.pedLaneW.state = 0
-                self.pedLaneW.hungerLevel += 1
-                pixels[5] = colorRed
-
-                self.pedLaneE.state = 0
-                self.pedLaneE.hungerLevel += 1
-                pixels[6] = colorRed
-                
-                self.subLaneS1.state = 1
-                self.subLaneS1.hungerLevel = 0
-                self.subLaneS2.state = 1
-                self.subLaneS2.hungerLevel = 0
-                pixels[8] = colorGreen
-                pixels[9] = colorGreen
-
-                self.pedLaneS.state = 0
-                self.pedLaneS.hungerLevel += 1
-                pixels[11] = colorRed
-            
-            elif phase == 5:
-                self.mainLaneEW2.state = 0
-                self.mainLaneEW2.hungerLevel += 1
-                pixels[0] = colorRed
-
-                self.mainLaneEW1.state = 0
-                self.mainLaneEW1.hungerLevel += 1
-                pixels[1] = colorRed
-
-                self.mainLaneWE1.state = 0
-                self.mainLaneWE1.hungerLevel += 1
-                pixels[2] = colorRed
-
-                self.mainLaneWE2.state = 0
-                self.mainLaneWE2.hungerLevel += 1
-                pixels[3] = colorRed
-
-                self.pedLaneW.state = 0
-                self.pedLaneW.hungerLevel += 1
-                pixels[5] = colorRed
-
-                self.pedLaneE.state = 0
-                self.pedLaneE.hungerLevel += 1
-                pixels[6] = colorRed
-                            
-                self.subLaneS1.state = 2
-                self.subLaneS1.hungerLevel += 1
-                self.subLaneS2.state = 2
-                self.subLaneS2.hungerLevel += 1
-                pixels[8] = colorOrange
-                pixels[9] = colorOrange
-
-                self.pedLaneS.state = 0
-                self.pedLaneS.hungerLevel += 1
-                pixels[11] = colorRed
-
-            pixels.show()
+            # Lanes that get a green light are fed, the rest get hungrier
+            for lane, state in zip(self.lanes, phaseStates[phase]):
+                lane.state = state
+                if state == 1:
+                    lane.hungerLevel = 0
+                else:
+                    lane.hungerLevel += 1
+
+            # Only write the pixels that changed since the last phase, then push them all at once
+            changed = False
+            for index, color in phaseFrames[phase]:
+                if self.frame[index] != color:
+                    self.frame[index] = color
+                    pixels[index] = color
+                    changed = True
+
+            if changed:
+                pixels.show()
 
     def rebalanceLanes(self, sLane, stLane):
         # Allows cars to change lanes if the straight lane is emptier (< 1/4) compared to the straight + turn lane
@@ -359,15 +231,25 @@ class Junction:
                 else:
                     index += 1              
 
+    def report(self, now, states):
+        # Sends the tick state to PCside.py, one binary frame or one CSV line
+        if binaryProtocol:
+            serialPort.write(protocol.packTick(self.sequence, now, self.phase, self.changePhaseTimer, states))
+            self.sequence = (self.sequence + 1) & 0xFF
+
+        else:
+            # Redo printing for easy reading as CSV
+            print("{0}, {1}, {2}, ".format(now, self.phase, self.changePhaseTimer), end = "")
+            for volume, wait in states:
+                print("{0}, {1}, ".format(volume, wait), end = "")
+            print("-")
+
     def tick(self):
         now = time.time()
         #print("Time: {0}".format(now))
         #print("Phase: {0}".format(self.phase))
         #print("Phase Countdown: {0}".format(self.changePhaseTimer))
 
-        # Redo printing for easy reading as CSV
-        print("{0}, {1}, {2}, ".format(now, self.phase, self.changePhaseTimer), end = "")
-
         # Rebalance the lanes
         self.rebalanceLanes(self.mainLaneEW2, self.mainLaneEW1)
         self.rebalanceLanes(self.mainLaneWE1, self.mainLaneWE2)
@@ -377,34 +259,13 @@ class Junction:
         #
         # For each lane:
         #   Call their tick() methods
-        self.mainLaneEW2.tick()
-        self.mainLaneEW2.show()
-
-        self.mainLaneEW1.tick()
-        self.mainLaneEW1.show()
-
-        self.mainLaneWE1.tick()
-        self.mainLaneWE1.show()
-
-        self.mainLaneWE2.tick()
-        self.mainLaneWE2.show()
-
-        self.subLaneS1.tick()
-        self.subLaneS1.show()
-
-        self.subLaneS2.tick()
-        self.subLaneS2.show()
-
-        self.pedLaneW.tick()
-        self.pedLaneW.show()
+        #   Keep (length, wait) for the report
+        states = []
+        for lane in self.lanes:
+            lane.tick()
+            states.append((lane.volume(), lane.waitingTime()))
 
-        self.pedLaneE.tick()
-        self.pedLaneE.show()
-
-        self.pedLaneS.tick()
-        self.pedLaneS.show()
-
-        print("-")
+        self.report(now, states)
 
         # Calculate phase 0 and phase 3 scores
         P0Vol = sum((self.mainLaneWE1.volume(), self.mainLaneWE2.volume(), self.mainLaneEW1.volume(), self.mainLaneEW2.volume(), self.pedLaneS.volume()))
@@ -454,60 +315,115 @@ class Junction:
             # Tick downwards
             self.changePhaseTimer -= 1
 
-async def intPinLane(pin, lane):
-    # Physical pin inputs to GND (low or False) correspond with a vehicle or person entering the lane
-    with keypad.Keys((pin,), value_when_pressed = False) as keys:
-        while True:
-            event = keys.events.get()
-            if event:
-                if event.pressed:
-                    lane.actorQueue.append(time.time())
-                    #print("+A {0}".format(lane.name))
-
-            await asyncio.sleep(0)
-
 def readSerialRaw():
-    # Reads the incoming sent data through the console serial port
-    byteCount = usb_cdc.console.in_waiting
-    text = ""
+    # Reads the incoming sent bytes from the serial port
+    byteCount = serialPort.in_waiting
+    data = b""
     if byteCount:
-        text = usb_cdc.console.read(byteCount).decode("utf-8")
-    return text
-
+        data = serialPort.read(byteCount)
+    return data
+
+
+def addActors(value, lanes):
+    # Adds an actor to every lane with its bit set in the 9-bit value
+    now = time.time()
+    bitMask = 0b100000000   # 9-bit mask, starting with the 9th bit
+    for lane in lanes:
+        if value & bitMask: # If the bit at that position is 1, add an actor to the lane
+            lane.actorQueue.append(now)
+            #print("+A {0}".format(lane.name))
+        
+        bitMask >>= 1       # Move the bit mask one place to the right to get the next bit
 
 def processText(serialBuffer, lanes):
     #Gets the 9 bits saved in hexadecimal text sent through console serial port
     try:
-        value = int(serialBuffer, 16)
-        bitMask = 0b100000000   # 9-bit mask, starting with the 9th bit
-        for lane in lanes:
-            if value & bitMask: # If the bit at that position is 1, add an actor to the lane
-                lane.actorQueue.append(time.time())
-                #print("+A {0}".format(lane.name))
-            
-            bitMask >>= 1       # Move the bit mask one place to the right to get the next bit
+        addActors(int(serialBuffer, 16), lanes)
 
     except:
         # Because it's not hexadecimal
         pass
 
-async def intSerialLane(lanes):
-    # Event handler for incoming serial data
+def processFrames(reader, data, lanes):
+    # Adds the actors of every complete injection frame, a batch of 9-bit values
+    dropped = reader.dropped
+    for kind, sequence, payload in reader.feed(data):
+        if kind == protocol.INJECT:
+            for value in protocol.unpackInject(payload):
+                addActors(value, lanes)
+
+    if reader.dropped != dropped:
+        # The console is free in binary mode
+        print("D, {0}, {1}".format(reader.dropped, reader.errors))
+
+async def intInputs(pinLanes, lanes):
+    # One task for every input: the lane pins and the serial port.
+    # Physical pin inputs to GND (low or False) correspond with a vehicle or person entering the lane.
+    # A single keypad.Keys scans all the pins in the background and queues the presses, so when nothing
+    # is coming in we can sleep (a bit longer every time) instead of polling in a tight loop.
+    pins = tuple(pin for pin, lane in pinLanes)
     serialBuffer = ""
-    while True:
-        serialBuffer += readSerialRaw()
-        if serialBuffer.endswith("\n"):
-            serialBuffer = serialBuffer[:-1]    # Remove newline character
-            processText(serialBuffer, lanes)
-            serialBuffer = ""
+    reader = protocol.Reader()
+    idleSleep = 0
+    with keypad.Keys(pins, value_when_pressed = False) as keys:
+        while True:
+            busy = False
 
-        await asyncio.sleep(0)
+            event = keys.events.get()
+            while event:
+                if event.pressed:
+                    pinLanes[event.key_number][1].actorQueue.append(time.time())
+                    #print("+A {0}".format(pinLanes[event.key_number][1].name))
+                busy = True
+                event = keys.events.get()
+
+            data = readSerialRaw()
+            if data and binaryProtocol:
+                busy = True
+                processFrames(reader, data, lanes)
+
+            elif data:
+                busy = True
+                serialBuffer += data.decode("utf-8")
+                newline = serialBuffer.find("\n")
+                while newline >= 0:
+                    processText(serialBuffer[:newline], lanes)
+                    serialBuffer = serialBuffer[newline + 1:]
+                    newline = serialBuffer.find("\n")
+
+            if busy:
+                idleSleep = 0
+            else:
+                idleSleep = min(max(idleSleep * 2, idleSleepMin), idleSleepMax)
+
+            await asyncio.sleep(idleSleep)
+
+def reportJitter(periods):
+    # Prints count, mean, standard deviation, min and max of the tick periods in ms
+    count = len(periods)
+    mean = sum(periods) / count
+    deviation = (sum((period - mean) ** 2 for period in periods) / count) ** 0.5
+    print("J, {0}, {1:.3f}, {2:.3f}, {3:.3f}, {4:.3f}".format(count, mean, deviation, min(periods), max(periods)))
 
 async def loop(junction):
-    # Main program loop
+    # Main program loop. Ticks are scheduled against a deadline, so the time tick() itself takes
+    # doesn't get added on top of timeInterval every time
+    interval = int(timeInterval * 1000000000)
+    nextTick = time.monotonic_ns()
+    lastTick = None
+    periods = []
     while True:
+        now = time.monotonic_ns()
+        if measureJitter and lastTick is not None:
+            periods.append((now - lastTick) / 1000000)
+            if len(periods) == 60:
+                reportJitter(periods)
+                periods = []
+        lastTick = now
+
         junction.tick()
-        await asyncio.sleep(timeInterval)
+        nextTick += interval
+        await asyncio.sleep(max(0, nextTick - time.monotonic_ns()) / 1000000000)
 
 # Contains the initialization bits
 async def setup():
@@ -530,23 +446,24 @@ async def setup():
     junction.setPhase(0)
 
     # Assign lanes to interruptable digital pins
-    intV_EW_2 = asyncio.create_task(intPinLane(board.D12, V_WE_1))
-    intV_EW_1 = asyncio.create_task(intPinLane(board.D11, V_WE_2))
-    intV_WE_1 = asyncio.create_task(intPinLane(board.D10, V_EW_1))
-    intV_WE_2 = asyncio.create_task(intPinLane(board.D9, V_WE_2))
-    intV_SX_1 = asyncio.create_task(intPinLane(board.D8, V_SX_1))
-    intV_SE_2 = asyncio.create_task(intPinLane(board.D7, V_SE_2))
-
-    intP_NS_W = asyncio.create_task(intPinLane(board.D6, P_W))
-    intP_NS_E = asyncio.create_task(intPinLane(board.D5, P_E))
-    intP_WE_S = asyncio.create_task(intPinLane(board.D4, P_S))
+    pinLanes = (
+        (board.D12, V_WE_1),
+        (board.D11, V_WE_2),
+        (board.D10, V_EW_1),
+        (board.D9, V_WE_2),
+        (board.D8, V_SX_1),
+        (board.D7, V_SE_2),
+        (board.D6, P_W),
+        (board.D5, P_E),
+        (board.D4, P_S),
+    )
 
     # Periodic tasks
     loopFunc = asyncio.create_task(loop(junction))
-    serialFunc = asyncio.create_task(intSerialLane(lanes))
+    inputFunc = asyncio.create_task(intInputs(pinLanes, lanes))
 
     # Set up asynchronous task execution
-    await asyncio.gather(intV_WE_1, intV_WE_2, intV_EW_1, intV_EW_2, intV_SX_1, intV_SE_2, intP_NS_W, intP_NS_E, intP_WE_S, loopFunc, serialFunc)
+    await asyncio.gather(loopFunc, inputFunc)
 
 # Call the setup() function asynchronously
 asyncio.run(setup())
\ No newline at end of file
@@ -0,0 +1,101 @@
+# Binary framing for the serial link between PCside.py and the board (code.py).
+# Runs on CPython and CircuitPython, copy it to the CIRCUITPY drive next to code.py.
+#
+# Frame: A5 5A | type (1) | sequence (1) | payload length (1) | payload | checksum (1)
+#   checksum is the sum of type, sequence, length and payload bytes, modulo 256
+#   sequence counts up (mod 256) per direction, a gap means frames were lost
+#
+# Types:
+#   TICK    board -> PC, one per Junction.tick():
+#           time (uint32), phase (uint8), countdown (int8), then for each of the 9 lanes
+#           queue length (uint8) and mean waiting time in tenths of a second (uint16)
+#   INJECT  PC -> board, any number of actors at once:
+#           one uint16 per actor, the 9-bit lane mask that used to be sent as a hex line,
+#           at most MAX_MASKS per frame, more actors go in more frames
+
+import struct
+
+SYNC = b"\xa5\x5a"
+TICK = 0x54     # "T"
+INJECT = 0x49   # "I"
+
+HEADER = "<BBB"
+HEADER_SIZE = struct.calcsize(HEADER)
+LANE_COUNT = 9
+TICK_FORMAT = "<IBb" + "BH" * LANE_COUNT
+MAX_MASKS = 127     # Payload length has to fit in one byte
+
+def checksum(data):
+    return sum(data) & 0xFF
+
+def frame(kind, sequence, payload):
+    body = struct.pack(HEADER, kind, sequence & 0xFF, len(payload)) + payload
+    return SYNC + body + bytes((checksum(body),))
+
+def packTick(sequence, now, phase, countdown, lanes):
+    # lanes is a list of (queue length, waiting time in seconds)
+    values = [int(now), phase, max(-128, min(127, countdown))]
+    for length, wait in lanes:
+        values.append(min(length, 255))
+        values.append(min(int(wait * 10 + 0.5), 65535))
+    return frame(TICK, sequence, struct.pack(TICK_FORMAT, *values))
+
+def unpackTick(payload):
+    # Returns (time, phase, countdown, [(queue length, waiting time), ...])
+    values = struct.unpack(TICK_FORMAT, payload)
+    lanes = [(values[i], values[i + 1] / 10) for i in range(3, len(values), 2)]
+    return values[0], values[1], values[2], lanes
+
+def injectFrames(masks):
+    # Number of frames (and sequence numbers) packInject uses for these masks
+    return (len(masks) + MAX_MASKS - 1) // MAX_MASKS
+
+def packInject(sequence, masks):
+    # One frame per MAX_MASKS masks, numbered from sequence on
+    frames = b""
+    for i in range(injectFrames(masks)):
+        chunk = masks[i * MAX_MASKS:(i + 1) * MAX_MASKS]
+        frames += frame(INJECT, sequence + i, struct.pack("<" + "H" * len(chunk), *chunk))
+    return frames
+
+def unpackInject(payload):
+    return struct.unpack("<" + "H" * (len(payload) // 2), payload)
+
+class Reader:
+    # Cuts a byte stream into (type, sequence, payload) frames. Garbage and frames with a bad
+    # checksum are skipped until the next sync bytes, gaps in the sequence are counted in dropped.
+    def __init__(self):
+        self.buffer = b""
+        self.sequence = None
+        self.dropped = 0
+        self.errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(SYNC)
+            if start < 0:
+                self.buffer = self.buffer[-1:]  # Could be the first sync byte
+                return frames
+            if len(self.buffer) < start + 2 + HEADER_SIZE:
+                self.buffer = self.buffer[start:]
+                return frames
+
+            kind, sequence, length = struct.unpack(HEADER, self.buffer[start + 2:start + 2 + HEADER_SIZE])
+            end = start + 2 + HEADER_SIZE + length
+            if len(self.buffer) < end + 1:
+                self.buffer = self.buffer[start:]
+                return frames
+
+            body = self.buffer[start + 2:end]
+            if checksum(body) != self.buffer[end]:
+                self.errors += 1
+                self.buffer = self.buffer[start + 1:]
+                continue
+
+            if self.sequence is not None:
+                self.dropped += (sequence - self.sequence - 1) & 0xFF
+            self.sequence = sequence
+            frames.append((kind, sequence, body[HEADER_SIZE:]))
+            self.buffer = self.buffer[end + 1:]
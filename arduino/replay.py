@@ -0,0 +1,178 @@
+import time
+import optparse
+
+import numpy as np
+
+# Replays a recorded board session through the phase decision of Junction.tick() in code.py, offline.
+# Reads output.txt as written by PCside.py: the CSV lines of code.py ("time, phase, countdown, len, wait, ..., -")
+# or the older verbose blocks ("Time: ..", "Phase: ..", "L VW > E  : len .., wait ..", "-----").
+#
+# The trace is kept as arrays (one row per tick), and every decision point (countdown 0 in phase 0 or 3)
+# is scored for all the weightings at once. This is open loop: we only see what each weighting would
+# have decided on the recorded state, not what would have happened after a different decision.
+#
+#   python replay.py output.txt
+#   python replay.py output.txt --weights 1,1,1 --weights 2,4,1
+
+# Lanes in the order of Junction.lanes (and of the CSV lines)
+laneNames = ("VE > W", "VE > W/S", "VW > E", "VW > E/S", "VS > W/E", "VS > E", "PX West", "PX East", "PX South")
+EW2, EW1, WE1, WE2, SX1, SE2, PW, PE, PS = range(9)
+
+# Same as phaseStates in code.py
+phaseStates = np.array((
+    (1, 1, 1, 1, 0, 0, 0, 0, 1),
+    (1, 1, 1, 1, 0, 0, 0, 0, 0),
+    (2, 2, 2, 2, 0, 0, 0, 0, 0),
+    (0, 0, 0, 0, 1, 1, 1, 1, 0),
+    (0, 0, 0, 0, 1, 1, 0, 0, 0),
+    (0, 0, 0, 0, 2, 2, 0, 0, 0),
+))
+
+# turnModulus of each lane in code.py (the Lane() arguments in setup), Lane.tick() only resets
+# hungerLevel on the lanes where it is 1
+turnModulus = np.array((1, 2, 1, 2, 5, 1, 1, 1, 1))
+
+# Lanes in the phase 0 and phase 3 scores
+phase0Lanes = [WE1, WE2, EW1, EW2, PS]
+phase3Lanes = [SX1, SE2, PW, PE]
+
+boardWeights = (2, 2, 1)    # A, B, C in code.py
+
+class Trace:
+    def __init__(self, times, phases, countdowns, lengths, waits):
+        self.times = np.array(times, dtype=np.int64)
+        self.phases = np.array(phases, dtype=np.int8)
+        self.countdowns = np.array(countdowns, dtype=np.int16)
+        self.lengths = np.array(lengths, dtype=np.int16).reshape(-1, len(laneNames))    # ticks x lanes
+        self.waits = np.array(waits, dtype=np.float32).reshape(-1, len(laneNames))      # ticks x lanes, seconds
+
+    def __len__(self):
+        return len(self.times)
+
+def loadTrace(path):
+    times, phases, countdowns, lengths, waits = [], [], [], [], []
+    laneIndex = dict((name, index) for index, name in enumerate(laneNames))
+    block = None    # Lengths and waits of the verbose block being read
+
+    with open(path) as f:
+        for line in f:
+            if line.startswith("Time: "):
+                times.append(int(line[6:]))
+                block = [[0] * len(laneNames), [0.0] * len(laneNames)]
+
+            elif line.startswith("Phase: "):
+                phases.append(int(line[7:]))
+
+            elif line.startswith("Phase Countdown: "):
+                countdowns.append(int(line[17:]))
+
+            elif line.startswith("L ") and block is not None:
+                name, values = line[2:].split(":", 1)
+                length, wait = values.split(",")
+                index = laneIndex[name.strip()]
+                block[0][index] = int(length.split()[1])
+                block[1][index] = float(wait.split()[1])
+
+            elif line.startswith("---") and block is not None:
+                lengths += block[0]
+                waits += block[1]
+                block = None
+
+            elif line.rstrip().endswith("-") and line[0].isdigit():
+                fields = line.split(",")
+                if len(fields) != 4 + 2 * len(laneNames):
+                    continue    # Cut off line, like the last one after Ctrl-C
+                times.append(int(float(fields[0])))
+                phases.append(int(fields[1]))
+                countdowns.append(int(fields[2]))
+                lengths += [int(value) for value in fields[3:-1:2]]
+                waits += [float(value) for value in fields[4:-1:2]]
+
+    count = len(lengths) // len(laneNames)   # Drop a block that was cut off
+    return Trace(times[:count], phases[:count], countdowns[:count], lengths, waits)
+
+def hungerLevels(trace, lane):
+    # hungerLevel of a lane at every tick, rebuilt from the phase changes since it isn't logged:
+    # setPhase() resets it for go lanes and adds 1 for the rest, Lane.tick() resets it when a
+    # single-direction lane lets an actor out (seen as a shorter queue while the lane isn't stopped).
+    # Lanes with turns (turnModulus > 1) pop actors without that, and rebalanceLanes() only takes
+    # actors out of those, so a shorter queue there doesn't feed the lane.
+    # The trace is taken to start right after a setPhase(), like setup() does.
+    phases = trace.phases
+    changed = np.ones(len(trace), dtype=bool)
+    changed[1:] = phases[1:] != phases[:-1]
+    state = phaseStates[phases, lane]
+
+    popped = np.zeros(len(trace), dtype=bool)
+    if turnModulus[lane] == 1:
+        popped[1:] = (trace.lengths[1:, lane] < trace.lengths[:-1, lane]) & (state[1:] > 0)
+
+    hungrier = changed & (state != 1)
+    fed = (changed & (state == 1)) | popped
+    count = np.cumsum(hungrier)
+    return count - np.maximum.accumulate(np.where(fed, count, 0))
+
+def decisionPoints(trace):
+    # Ticks where the board chose between staying in phase 0 or 3 and moving on,
+    # and whether it stayed (the next tick shows the same phase)
+    ticks = np.flatnonzero((trace.countdowns[:-1] <= 0) & ((trace.phases[:-1] == 0) | (trace.phases[:-1] == 3)))
+    stayed = trace.phases[ticks + 1] == trace.phases[ticks]
+    return ticks, stayed
+
+def replay(trace, weights):
+    # Decisions of every (A, B, C) in weights at every decision point: stay (True) or move on,
+    # returns (ticks, recorded decisions, weightings x ticks decisions, phase 0 scores, phase 3 scores)
+    ticks, stayed = decisionPoints(trace)
+    lengths, waits = trace.lengths[ticks], trace.waits[ticks]
+
+    # Features x ticks, so the scores of all weightings are one matrix product
+    phase0 = np.array((lengths[:, phase0Lanes].sum(1), waits[:, phase0Lanes].sum(1), hungerLevels(trace, WE1)[ticks] / 4))
+    phase3 = np.array((lengths[:, phase3Lanes].sum(1), waits[:, phase3Lanes].sum(1), hungerLevels(trace, SX1)[ticks] / 2))
+    weights = np.asarray(weights, dtype=float).reshape(-1, 3)
+    scores0, scores3 = weights @ phase0, weights @ phase3
+
+    inPhase0 = trace.phases[ticks] == 0
+    decisions = np.where(inPhase0, scores0 > scores3, scores3 > scores0)
+    return ticks, stayed, decisions, scores0, scores3
+
+def parseWeights(text):
+    values = tuple(float(value) for value in text.split(","))
+    if len(values) != 3:
+        raise ValueError("weights are A,B,C: {0}".format(text))
+    return values
+
+def decisionName(stay):
+    return "stay" if stay else "next"
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser(usage="%prog [options] output.txt")
+    optParser.add_option("--weights", action="append", default=[],
+                         help="A,B,C to compare with the recorded decisions, can be given more than once")
+    optParser.add_option("--limit", type="int", default=20, help="differences listed per weighting")
+    options, args = optParser.parse_args()
+    if len(args) != 1:
+        optParser.error("give the output.txt to replay")
+
+    start = time.perf_counter()
+    trace = loadTrace(args[0])
+    loaded = time.perf_counter()
+
+    weights = [boardWeights] + [parseWeights(text) for text in options.weights]
+    ticks, stayed, decisions, scores0, scores3 = replay(trace, weights)
+    replayed = time.perf_counter()
+
+    print("{0} ticks, {1} decisions, loaded in {2:.3f} s, {3} weightings replayed in {4:.2f} ms".format(
+        len(trace), len(ticks), loaded - start, len(weights), (replayed - loaded) * 1000))
+
+    for index, weight in enumerate(weights):
+        different = np.flatnonzero(decisions[index] != stayed)
+        label = "board" if index == 0 else "alternative"
+        print("A={0:g} B={1:g} C={2:g} ({3}): {4} of {5} decisions differ from the recording".format(
+            weight[0], weight[1], weight[2], label, len(different), len(ticks)))
+        for point in different[:options.limit]:
+            tick = ticks[point]
+            print("  time {0}, phase {1}: recorded {2}, replayed {3} (scores {4:.2f} / {5:.2f})".format(
+                trace.times[tick], trace.phases[tick], decisionName(stayed[point]), decisionName(decisions[index, point]),
+                scores0[index, point], scores3[index, point]))
+        if len(different) > options.limit:
+            print("  ...")
@@ -0,0 +1,27 @@
+import numpy as np
+
+from replay import Trace, hungerLevels, SX1, SE2, laneNames
+
+# hungerLevels() against what Lane.tick() and Junction.setPhase() in code.py do.
+# python -m pytest arduino (from the repo root, in here code.py hides the standard library's code module)
+
+
+def trace(phases, lane, lengths):
+    # a trace where only `lane` has a queue
+    queues = np.zeros((len(phases), len(laneNames)), dtype=int)
+    queues[:, lane] = lengths
+    return Trace(range(len(phases)), phases, [0] * len(phases), queues.ravel(), np.zeros(queues.size))
+
+
+def test_turning_lane_keeps_its_hunger_when_it_pops():
+    # SX1 (turnModulus 5) lets actors out in the caution phase 5, tick() doesn't reset its hunger for that
+    phases = [3, 4, 5, 5, 5, 0, 0]
+    levels = hungerLevels(trace(phases, SX1, [6, 5, 4, 3, 2, 2, 2]), SX1)
+    assert list(levels) == [0, 0, 1, 1, 1, 2, 2]
+
+
+def test_single_direction_lane_is_fed_when_it_pops():
+    # SE2 (turnModulus 1) gets hungerLevel = 0 from tick() for every actor it lets out
+    phases = [3, 4, 5, 5, 5, 0, 0]
+    levels = hungerLevels(trace(phases, SE2, [6, 5, 4, 3, 3, 3, 3]), SE2)
+    assert list(levels) == [0, 0, 0, 0, 0, 1, 1]
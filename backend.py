@@ -0,0 +1,36 @@
+import subprocess
+
+# the controllers (runner.algorithm / fixed, network.control, ...) only ever talk to a `conn`:
+#   conn.simulationStep(), conn.close(),
+#   conn.lane / conn.trafficlight / conn.simulation / conn.inductionloop .subscribe(...), .getSubscriptionResults(...),
+#   .getAllSubscriptionResults(), conn.trafficlight.setPhase / setPhaseDuration, conn.simulation.saveState / loadState
+# traci (module or labelled connection), libsumo and faketraci.FakeTraci all have that, start() gives one of
+# the first two for a sumo command line.
+#
+# traci talks to a sumo process over a socket, one round-trip per call and per step. libsumo is sumo
+# built into the python process, the same calls are plain function calls. the catch: no sumo-gui, and
+# one simulation per process (so the workers of sweep.py & co. still work, each is its own process).
+#
+# python bench_backend.py
+
+BACKENDS = ["traci", "libsumo"]
+
+
+def start(command, backend="traci", label=None, port=None, quiet=False):
+    # starts sumo with this command line, returns the conn. label / port are only for traci
+    if backend == "libsumo":
+        if "gui" in command[0]:
+            raise ValueError("libsumo can't run sumo-gui, use --nogui")
+        import libsumo
+        libsumo.start(command)
+        return libsumo
+    if backend != "traci":
+        raise ValueError("unknown backend {0}, use one of {1}".format(backend, BACKENDS))
+
+    import traci
+    stdout = subprocess.DEVNULL if quiet else None
+    if label is None:
+        traci.start(command, port=port, stdout=stdout)
+        return traci
+    traci.start(command, port=port, label=label, stdout=stdout)
+    return traci.getConnection(label)
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import optparse
+import contextlib
+
+from runner import checkBinary, algorithm, fixed, CFG  # runner sets up the SUMO_HOME path
+import backend
+
+# steps per second of runner.algorithm() and runner.fixed() on data/T.sumocfg, with sumo behind a traci
+# socket and with libsumo in the process (see backend.py). start is the time to start sumo and load
+# the scenario, steps/s only counts the controller loop (3601 steps). both give the same averages.
+# on T the steps are about the same with both (~210/s): the controllers read everything with subscriptions,
+# one round-trip per step, and the step itself is sumo's work (the insertion buffer grows to >1000 vehicles
+# as T.rou.xml sends more than the junction lets through). what libsumo saves is the start, 1 s -> 0.02 s,
+# traci waits for the sumo process to open its port. --sumo-options is for trying e.g. "--full-output NUL".
+#
+# python bench_backend.py --repeat 3 --sumo-options "--full-output NUL"
+
+CONTROLLERS = {"algorithm": algorithm, "fixed": fixed}
+
+
+def bench(name, controller, repeat=3, sumo_options=()):
+    # (start s, steps/s, averages) for every run
+    runs = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        command = [checkBinary('sumo'), "-c", CFG, "--no-step-log", "--no-warnings"] + list(sumo_options)
+        conn = backend.start(command, name, quiet=True)
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            averages = CONTROLLERS[controller](conn=conn, output=None)
+        runs.append((started - start, 3601 / (time.perf_counter() - started), averages))
+    return runs
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--repeat", type="int", default=3)
+    optParser.add_option("--backends", default=",".join(backend.BACKENDS))
+    optParser.add_option("--sumo-options", default="", help="more sumo options, space separated")
+    options, args = optParser.parse_args()
+
+    print("backend, controller, start s, steps/s (best of {0}), average waiting time".format(options.repeat))
+    for name in options.backends.split(","):
+        for controller in CONTROLLERS:
+            runs = bench(name, controller, options.repeat, options.sumo_options.split())
+            print("{0}, {1}, {2:.3f}, {3:.0f}, {4:.4f}".format(name, controller, min(run[0] for run in runs),
+                  max(run[1] for run in runs), runs[0][2][0]))
+            sys.stdout.flush()
@@ -0,0 +1,43 @@
+import re
+import sys
+import optparse
+import subprocess
+
+# startup budget: import time of the modules a run or a sweep worker starts with, from python -X importtime
+# (cumulative us of the module, median of --repeat fresh interpreters). fails if one is over its budget and
+# then shows the slowest imports under it, so a new top-level import of pandas & co. gets noticed.
+# most of what's left is traci, which loads sumolib and numpy on its own.
+#
+# python bench_import.py --repeat 5
+
+BUDGETS = {"runner": 150, "sweep": 150, "montecarlo": 150, "fork": 150}    # ms
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module):
+    # {imported module: (self us, cumulative us)} for one fresh `import module`
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    times = {}
+    for match in LINE.finditer(process.stderr):
+        times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--repeat", type="int", default=5)
+    optParser.add_option("--top", type="int", default=10, help="slowest imports to show for a module over budget")
+    options, args = optParser.parse_args()
+
+    over = False
+    for module, budget in sorted(BUDGETS.items()):
+        runs = sorted((importtime(module) for _ in range(options.repeat)), key=lambda times: times[module][1])
+        times = runs[len(runs) // 2]
+        total = times[module][1] / 1000
+        print("{0:<12} {1:>7.1f} ms  (budget {2} ms) {3}".format(module, total, budget, "OVER" if total > budget else "ok"))
+        if total > budget:
+            over = True
+            for name, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][1])[1:options.top + 1]:
+                print("    {0:<40} {1:>7.1f} ms".format(name, cumulative / 1000))
+    sys.exit(1 if over else 0)
@@ -0,0 +1,82 @@
+import time
+import optparse
+import subprocess
+
+import numpy as np
+
+from runner import checkBinary, traci, algo  # runner sets up the SUMO_HOME path
+from gridnet import generate
+from junction import load_junctions
+from network import Network
+from telemetry import green_duration
+
+# step time of network.control() against the number of controlled junctions, on gridnet.py grids.
+# per step: sumo's simulationStep, reading the subscriptions, and the decision for every junction,
+# batched (Network.decide) and, for comparison, with runner.algo() in a python loop over the junctions.
+# the decision is timed on every step (on a copy of the hunger levels), but only applied every --min steps.
+#
+# python bench_network.py --sizes 4,8,11,16,23 --steps 300
+
+
+def looped(network, data):
+    # the same scores and durations, one junction at a time
+    hungerlevel = network.hungerlevel.copy()
+    offset = 0
+    for index, junction in enumerate(network.junctions):
+        lanes = data["lanes"][offset:offset + len(junction.lanes)]
+        offset += len(junction.lanes)
+        first = network.first[index]
+        junction_data = {"lanes": lanes}
+        algo(list(hungerlevel[first:first + len(junction.greens)]), junction_data, junction)
+        [green_duration(junction_data, group) for group in junction.groups]
+
+
+def bench(size, steps, min=47, directory="/tmp/bench_network"):
+    cfg, net = generate(size, "{0}/grid{1}".format(directory, size))
+    network = Network(load_junctions(net))
+    traci.start([checkBinary('sumo'), "-c", cfg, "--no-step-log", "--no-warnings"], stdout=subprocess.DEVNULL)
+    for id, junction in zip(network.ids, network.junctions):
+        traci.trafficlight.setPhase(id, junction.greens[0])
+    network.subscribe(traci)
+
+    times = np.zeros((steps, 5))    # sumo, read, batched decision, looped decision, setPhase calls
+    for step in range(steps):
+        start = time.perf_counter()
+        traci.simulationStep()
+        stepped = time.perf_counter()
+        data = network.read(traci)
+        read = time.perf_counter()
+
+        hungerlevel = network.hungerlevel.copy()
+        leave, stay, durations = network.decide(data)
+        decided = time.perf_counter()
+        looped(network, data)
+        loop = time.perf_counter()
+
+        if step % min == 0:
+            following = (data["phase"][leave] + 1) % network.phases[leave]
+            for index, phase in zip(leave, following):
+                traci.trafficlight.setPhase(network.ids[index], phase)
+            for index, duration in zip(stay, durations):
+                traci.trafficlight.setPhase(network.ids[index], data["phase"][index])
+                traci.trafficlight.setPhaseDuration(network.ids[index], duration)
+        else:
+            network.hungerlevel = hungerlevel
+        applied = time.perf_counter()
+        times[step] = [stepped - start, read - stepped, decided - read, loop - decided, applied - loop]
+
+    traci.close()
+    return len(network.junctions), len(network.lanes), times.mean(0) * 1000, times[::min, 4].mean() * 1000
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--sizes", default="4,8,11,16,23", help="grid sides, size^2 - 4 junctions are controlled")
+    optParser.add_option("--steps", type="int", default=300)
+    optParser.add_option("--min", type="int", default=47, help="steps between decisions")
+    options, args = optParser.parse_args()
+
+    print("junctions, lanes, ms per step: sumo, read, decide (batched), decide (looped), setPhase (decision steps)")
+    for size in [int(value) for value in options.sizes.split(",")]:
+        junctions, lanes, means, apply = bench(size, options.steps, options.min)
+        print("{0}, {1}, {2:.2f}, {3:.2f}, {4:.3f}, {5:.2f}, {6:.2f}".format(junctions, lanes, means[0], means[1], means[2], means[3], apply))
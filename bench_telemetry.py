@@ -0,0 +1,77 @@
+import sys
+import time
+import optparse
+
+from runner import checkBinary, traci, algo, NET
+from junction import load_junction
+from telemetry import Telemetry
+import traci.connection  # noqa
+
+# counts traci round-trips per step for the old getter-based loop vs the subscription loop.
+# usage: python bench_telemetry.py [--steps 600]
+
+calls = [0]
+sendExact = traci.connection.Connection._sendExact
+
+
+def counted(self):
+    calls[0] += 1
+    return sendExact(self)
+
+
+junction = load_junction(NET)
+phase0 = [junction.lanes[i] for i in junction.groups[0]]
+phase3 = [junction.lanes[i] for i in junction.groups[1]]
+
+
+def legacy(steps):
+    # the same getters the old algorithm() made every step (decision steps also read the scores and the duration)
+    lane = traci.lane
+    for step in range(steps):
+        traci.simulationStep()
+        if step % 47 == 0:
+            for l in phase0 + phase3:
+                lane.getLastStepVehicleNumber(l)
+                lane.getWaitingTime(l)
+            traci.trafficlight.getPhase(junction.id)
+            for l in phase0:
+                lane.getLastStepVehicleNumber(l)
+                lane.getLastStepLength(l)
+                lane.getLastStepMeanSpeed(l)
+        for l in junction.lanes:
+            lane.getWaitingTime(l)
+        for l in junction.lanes:
+            lane.getLastStepVehicleNumber(l)
+        traci.simulation.getArrivedNumber()
+        traci.trafficlight.getPhase(junction.id)
+
+
+def subscribed(steps):
+    telemetry = Telemetry(junction)
+    telemetry.subscribe()
+    for step in range(steps):
+        traci.simulationStep()
+        data = telemetry.read()
+        if step % 47 == 0:
+            algo([0, 0], data, junction)
+
+
+def bench(name, loop, steps):
+    traci.start([checkBinary('sumo'), "-c", "data/T.sumocfg", "--no-step-log"])
+    calls[0] = 0
+    start = time.perf_counter()
+    loop(steps)
+    elapsed = time.perf_counter() - start
+    traci.close()
+    print("{0:<10} {1:>8.2f} round-trips/step {2:>10.1f} steps/s".format(name, calls[0] / steps, steps / elapsed))
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--steps", type="int", default=600, help="simulation steps per run")
+    options, args = optParser.parse_args()
+
+    traci.connection.Connection._sendExact = counted
+    bench("getters", legacy, options.steps)
+    bench("subscribe", subscribed, options.steps)
+    sys.stdout.flush()
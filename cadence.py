@@ -0,0 +1,100 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import traci  # noqa
+import traci.constants as tc  # noqa
+
+# event-driven decisions for runner.algorithm(cadence=Cadence(...)), instead of deciding every `min` steps.
+#
+# a green is re-evaluated when
+#   - COUNT vehicles arrived on the e1 detectors of data/T.add.xml on the lanes it doesn't serve (the
+#     ones waiting for the next green) since it started or since the last decision, a vehicle counts
+#     once however many loops and steps it is on, or the mean occupancy of those detectors went up by
+#     OCCUPANCY % since then, but not before the green had MIN_GREEN steps,
+#   - MAX_GREEN steps after it started, and then it is left no matter the scores.
+# a green where neither happens isn't looked at, it runs as long as the program (or the last decision)
+# says. so with little traffic the controller hardly runs (none of the T.rou.xml flows at 120 veh/h
+# fill the other road in a green), and when the other road fills up it gets to decide after the
+# minimum green instead of at the next multiple of 47.
+#
+# the detectors are subscribed like the lanes (telemetry.py), reading them costs no extra round-trips.
+
+ADDITIONAL = "data/T.add.xml"
+MIN_GREEN = 30
+MAX_GREEN = 90
+COUNT = 12
+OCCUPANCY = 60.0
+DETECTOR_VARS = (tc.LAST_STEP_VEHICLE_ID_LIST, tc.LAST_STEP_OCCUPANCY)
+
+
+def load_detectors(additional, lanes):
+    # (id, lane) of the e1 detectors (inductionLoop in newer files) on these lanes
+    root = ET.parse(additional).getroot()
+    return [(detector.get("id"), detector.get("lane")) for detector in list(root.iter("e1Detector")) + list(root.iter("inductionLoop"))
+            if detector.get("lane") in lanes]
+
+
+class Cadence:
+    def __init__(self, junction, additional=ADDITIONAL, conn=traci, min_green=MIN_GREEN, max_green=MAX_GREEN,
+                 count=COUNT, occupancy=OCCUPANCY):
+        self.junction = junction
+        self.conn = conn
+        detectors = load_detectors(additional, junction.lanes)
+        self.detectors = [detector for detector, lane in detectors]
+        # per green, the detectors on the lanes it doesn't serve, where the vehicles wait for the next one
+        lanes = [junction.lanes.index(lane) for detector, lane in detectors]
+        self.waiting = [[index for index, lane in enumerate(lanes) if lane not in group] for group in junction.groups]
+        self.min_green = min_green
+        self.max_green = max_green
+        self.count = count
+        self.occupancy = occupancy
+
+        self.green = -1         # the green we're timing, -1 between greens
+        self.start = 0          # step it started
+        self.arrived = set()    # vehicles on the waiting detectors since the green started or the last decision
+        self.occupied = 0.0     # mean occupancy of the waiting detectors then
+        self.forced = False     # the last due() was MAX_GREEN, the green has to end
+        self.reasons = {"detectors": 0, "max green": 0}
+
+    def subscribe(self):
+        # has to be called once before the first simulationStep, like Telemetry.subscribe()
+        for detector in self.detectors:
+            self.conn.inductionloop.subscribe(detector, DETECTOR_VARS)
+
+    def due(self, step, green):
+        # True when the controller should decide now, green is junction.group() of the current phase
+        self.forced = False
+        if green != self.green:
+            self.green = green
+            self.start = step
+            self.arrived = set()
+            self.occupied = 0.0
+        if green < 0:
+            return False
+
+        results = self.conn.inductionloop.getAllSubscriptionResults()
+        waiting = [results[self.detectors[index]] for index in self.waiting[green]]
+        for values in waiting:
+            self.arrived.update(values[tc.LAST_STEP_VEHICLE_ID_LIST])
+        occupied = np.mean([values[tc.LAST_STEP_OCCUPANCY] for values in waiting]) if waiting else 0.0
+
+        elapsed = step - self.start
+        if elapsed >= self.max_green:
+            self.forced = True
+            reason = "max green"
+        elif elapsed < self.min_green:
+            return False
+        elif len(self.arrived) >= self.count or occupied - self.occupied >= self.occupancy:
+            reason = "detectors"
+        else:
+            return False
+
+        self.reasons[reason] += 1
+        self.arrived = set()
+        self.occupied = occupied
+        return True
+
+    def close(self):
+        print("cadence: {0} decisions ({1})".format(sum(self.reasons.values()),
+              ", ".join("{0} {1}".format(count, reason) for reason, count in self.reasons.items())))
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import hashlib
+import optparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+# route files for T.net.xml from a small spec instead of editing T.rou.xml (the generate_routefile() hook
+# of runner.py). a spec is a dict, every key is optional, the defaults give the flows of T.rou.xml:
+#   volume       vehicles per hour of one flow (1800 in T.rou.xml)
+#   splits       {approach edge: factor}, e.g. {"gneE21": 0.5} halves the side road
+#   profile      "flat", "peak" (peak / width / factor: a gaussian bump on top of the flat demand,
+#                centered at `peak` s, factor 2 doubles it there) or a list of factors, one per interval
+#   interval     seconds per step of the profile, every flow is cut into these
+#   arrivals     "uniform" (evenly spaced like T.rou.xml) or "poisson" (period="exp(rate)", random per sumo seed)
+#   noise        relative spread of a lognormal factor per flow and interval, drawn with `seed`
+#   pedestrians  probability per second of each personFlow (0.01)
+#   seed, end
+#
+# the file goes to data/demand/<hash of the spec>.rou.xml and is only written if it isn't there yet,
+# so sweeps and montecarlo.py workers asking for the same spec get the same file for the cost of an
+# os.path.exists. files are written to a temporary name and renamed, workers can't see half a file.
+#
+# python demand.py --spec '{"profile": "peak", "factor": 2}'
+# python demand.py --variants 10000 --jobs 8      (noise seeds 0..9999 of the peak profile)
+# python runner.py --nogui --demand '{"splits": {"gneE21": 1.5}}'
+# python sweep.py --A 1,2 --demand '[{"volume": 900}, {"volume": 1800}]'
+# python montecarlo.py --demand variants.json     (a list of specs, seed i runs variant i)
+
+DIRECTORY = "data/demand"
+VERSION = 1     # part of the hash, bump it when the generated xml changes
+
+# the flows of T.rou.xml in their order (from, to), some movements have two of them
+FLOWS = [("gneE20", "-gneE19"), ("gneE20", "-gneE21"), ("gneE19", "-gneE21"), ("gneE19", "-gneE20"), ("gneE19", "-gneE20"),
+         ("gneE21", "-gneE20"), ("gneE21", "-gneE19"), ("gneE21", "-gneE20"), ("gneE20", "-gneE19")]
+PERSONS = [("-gneE21", "-gneE19"), ("-gneE19", "-gneE21"), ("gneE21", "gneE20"), ("gneE20", "gneE21"),
+           ("-gneE20", "gneE19"), ("gneE19", "-gneE20"), ("gneE20", "-gneE19"), ("-gneE19", "gneE20")]
+
+DEFAULTS = {"volume": 1800.0, "splits": {}, "profile": "flat", "peak": 1800.0, "width": 600.0, "factor": 2.0,
+            "interval": 3600, "arrivals": "uniform", "noise": 0.0, "pedestrians": 0.01, "seed": 42, "end": 3600}
+
+
+def normalize(spec):
+    # the spec with every default filled in, so {} and the spelled out defaults are the same demand
+    full = dict(DEFAULTS)
+    full.update(spec or {})
+    unknown = set(full) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("unknown demand keys {0}, use {1}".format(sorted(unknown), sorted(DEFAULTS)))
+    if full["arrivals"] not in ("uniform", "poisson"):
+        raise ValueError("arrivals is uniform or poisson, not {0}".format(full["arrivals"]))
+    return full
+
+
+def key(spec):
+    text = json.dumps([VERSION, normalize(spec)], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def profile(spec):
+    # one factor per interval
+    intervals = int(np.ceil(spec["end"] / spec["interval"]))
+    if isinstance(spec["profile"], list):
+        factors = np.resize(np.array(spec["profile"], dtype=float), intervals)
+    elif spec["profile"] == "peak":
+        middle = (np.arange(intervals) + 0.5) * spec["interval"]
+        factors = 1 + (spec["factor"] - 1) * np.exp(-0.5 * ((middle - spec["peak"]) / spec["width"]) ** 2)
+    elif spec["profile"] == "flat":
+        factors = np.ones(intervals)
+    else:
+        raise ValueError("profile is flat, peak or a list of factors, not {0}".format(spec["profile"]))
+    return factors
+
+
+def routes(spec):
+    # the route file for a normalized spec, as a string
+    factors = profile(spec)
+    random = np.random.default_rng(spec["seed"])
+    if spec["noise"] > 0:
+        sigma = np.sqrt(np.log(1 + spec["noise"] ** 2))
+        noise = random.lognormal(-sigma ** 2 / 2, sigma, (len(FLOWS), len(factors)))
+    else:
+        noise = np.ones((len(FLOWS), len(factors)))
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<!-- demand.py {0} -->'.format(json.dumps(spec, sort_keys=True).replace("--", "- -")),
+             '<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+             'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">']
+    # sumo wants the flows sorted by begin
+    for interval, factor in enumerate(factors):
+        begin = interval * spec["interval"]
+        end = min(begin + spec["interval"], spec["end"])
+        for index, (origin, destination) in enumerate(FLOWS):
+            rate = spec["volume"] / 3600 * spec["splits"].get(origin, 1.0) * factor * noise[index, interval]
+            if spec["arrivals"] == "poisson":
+                amount = 'period="exp({0:.6f})"'.format(rate)
+            else:
+                amount = 'number="{0}"'.format(int(round(rate * (end - begin))))
+            if amount != 'number="0"' and rate > 0:
+                lines.append('    <flow id="flow_{0}_{1}" begin="{2:.2f}" from="{3}" to="{4}" end="{5:.2f}" {6}/>'.format(
+                    index, interval, begin, origin, destination, end, amount))
+        for index, (origin, destination) in enumerate(PERSONS):
+            probability = min(spec["pedestrians"] * factor, 1.0)
+            if probability > 0:
+                lines.append('    <personFlow id="personFlow_{0}_{1}" begin="{2:.2f}" end="{3:.2f}" probability="{4:.6f}">'.format(
+                    index, interval, begin, end, probability))
+                lines.append('        <personTrip from="{0}" to="{1}"/>'.format(origin, destination))
+                lines.append('    </personFlow>')
+    lines.append('</routes>')
+    return "\n".join(lines) + "\n"
+
+
+def route_file(spec=None, directory=DIRECTORY):
+    # path of the route file for this spec, generated the first time it's asked for
+    path = os.path.join(directory, key(spec) + ".rou.xml")
+    if os.path.exists(path):
+        return path
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    text = routes(normalize(spec))
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, 'w') as f:
+        f.write(text)
+    os.replace(temporary, path)
+    return path
+
+
+def route_files(specs, jobs=None, directory=DIRECTORY):
+    # route_file() of many specs, the missing ones generated in a process pool
+    paths = [os.path.join(directory, key(spec) + ".rou.xml") for spec in specs]
+    missing = [(spec, directory) for spec, path in zip(specs, paths) if not os.path.exists(path)]
+    if missing:
+        with multiprocessing.Pool(jobs) as pool:
+            pool.starmap(route_file, missing, chunksize=64)
+    return paths
+
+
+def parse_spec(text):
+    # a spec on the command line: json, or the name of a json file
+    if os.path.exists(text):
+        with open(text) as f:
+            return json.load(f)
+    return json.loads(text)
+
+
+def parse_demand(text, jobs=None, directory=DIRECTORY):
+    # the route files of a --demand of sweep.py / montecarlo.py: one spec or a list of them, like parse_spec()
+    specs = parse_spec(text)
+    if isinstance(specs, dict):
+        specs = [specs]
+    return route_files(specs, jobs, directory)
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--spec", default="{}", help="demand spec, json or a json file")
+    optParser.add_option("--variants", type="int", default=0, help="also make this many noise seeds of the spec")
+    optParser.add_option("--noise", type="float", default=0.2, help="noise of the variants")
+    optParser.add_option("--jobs", type="int", default=None)
+    optParser.add_option("--directory", default=DIRECTORY)
+    options, args = optParser.parse_args()
+
+    spec = parse_spec(options.spec)
+    print(route_file(spec, options.directory))
+    if options.variants:
+        variants = [dict(spec, noise=options.noise, seed=seed) for seed in range(options.variants)]
+        for run in ("generate", "cached"):
+            start = time.perf_counter()
+            paths = route_files(variants, options.jobs, options.directory)
+            print("{0} variants ({1}) in {2:.2f} s".format(len(paths), run, time.perf_counter() - start))
@@ -0,0 +1,173 @@
+import os
+import time
+import optparse
+import multiprocessing
+
+import numpy as np
+
+from runner import NET  # runner sets up the SUMO_HOME path
+from sweep import CFG, quiet
+from pool import Worker, RECYCLE
+from junction import load_junction
+from telemetry import Telemetry, LANE_VARS, NUMBER, WAITING
+
+# step / reset around the gneJ27 control loop of runner.algorithm(), for training and evaluating learned
+# controllers, and VectorEnv to run many of them at once, one sumo per worker process.
+#
+#   observation  what algo() reads, the lanes x LANE_VARS of Telemetry (vehicles, length, mean speed and
+#                waiting time of the six lanes) flattened, then one-hot the green we're in (all 0 in between)
+#   action       index of the green to be in. another green than the current one leaves it like
+#                algorithm() does (setPhase(phase + 1), the program runs the yellow to the next green),
+#                the same one keeps it for the next decision. in between greens the action doesn't matter
+#   reward       minus the waiting time per vehicle (the "waiting time" column of dataalgo.csv),
+#                averaged over the `decision` steps the action was held
+#   done         when the episode (T = 3600 steps like the controllers) is over
+#
+# reset() reloads the worker's sumo with traci.load (pool.Worker), not a new process per episode.
+# VectorEnv sends the step to every worker before it waits for any of them, so the sumo steps of the
+# workers run at the same time, and returns everything as arrays with one row per env. an env that is
+# done is reset right away, its final observation is in the info.
+#
+# python env.py --envs 1,2,4 --steps 200
+
+DECISION = 5    # sumo steps per env step
+EPISODE = 3600
+
+
+class JunctionEnv:
+    def __init__(self, cfg=CFG, net=NET, decision=DECISION, episode=EPISODE, recycle=RECYCLE, label=None):
+        self.junction = load_junction(net)
+        self.decision = decision
+        self.episode = episode
+        self.worker = Worker(label or "env-{0}".format(os.getpid()), cfg, recycle)
+        self.conn = None
+        self.telemetry = None
+        self.step_count = 0
+        self.size = len(self.junction.lanes) * len(LANE_VARS) + len(self.junction.greens)
+
+    def observe(self, data):
+        green = np.zeros(len(self.junction.greens))
+        current = self.junction.group(data["phase"])
+        if current >= 0:
+            green[current] = 1
+        return np.concatenate([data["lanes"].ravel(), green])
+
+    def advance(self):
+        self.conn.simulationStep()
+        self.step_count += 1
+        self.data = self.telemetry.read()
+        volume = self.data["lanes"][:, NUMBER].sum()
+        return self.data["lanes"][:, WAITING].sum() / volume if volume else 0.0
+
+    def reset(self, seed=None, routes=None):
+        self.conn = self.worker.reset(23423 if seed is None else seed, routes)
+        self.telemetry = Telemetry(self.junction, self.conn)
+        self.conn.trafficlight.setPhase(self.junction.id, self.junction.greens[0])
+        self.telemetry.subscribe()
+        self.step_count = 0
+        self.advance()
+        return self.observe(self.data)
+
+    def step(self, action):
+        # returns (observation, reward, done, info)
+        phase = self.data["phase"]
+        current = self.junction.group(phase)
+        if current >= 0:
+            if action != current:
+                self.conn.trafficlight.setPhase(self.junction.id, phase + 1)
+            else:
+                self.conn.trafficlight.setPhaseDuration(self.junction.id, self.decision + 1)
+        waiting = [self.advance() for _ in range(self.decision)]
+        done = self.step_count > self.episode
+        return self.observe(self.data), -float(np.mean(waiting)), done, {"arrived": self.data["arrived"]}
+
+    def close(self):
+        self.worker.shutdown()
+
+
+def work(pipe, kwargs):
+    # one JunctionEnv in a worker process: ("reset", seed) / ("step", action) / ("close", None)
+    quiet()
+    env = JunctionEnv(**kwargs)
+    while True:
+        command, value = pipe.recv()
+        if command == "reset":
+            pipe.send(env.reset(value))
+        elif command == "step":
+            pipe.send(env.step(value))
+        else:
+            env.close()
+            pipe.send(None)
+            break
+
+
+class VectorEnv:
+    def __init__(self, count, seed=0, **kwargs):
+        # count JunctionEnvs, env i starts with seed + i and every reset gives it the next seed not used yet
+        self.count = count
+        self.seeds = [seed + index for index in range(count)]
+        self.pipes = []
+        self.processes = []
+        for index in range(count):
+            mine, theirs = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=work, args=(theirs, kwargs), daemon=True)
+            process.start()
+            self.pipes.append(mine)
+            self.processes.append(process)
+
+    def next_seed(self, index):
+        seed = self.seeds[index]
+        self.seeds[index] += self.count
+        return seed
+
+    def reset(self):
+        # observations, count x size
+        for index, pipe in enumerate(self.pipes):
+            pipe.send(("reset", self.next_seed(index)))
+        return np.stack([pipe.recv() for pipe in self.pipes])
+
+    def step(self, actions):
+        # (observations count x size, rewards, dones, infos), one action per env
+        for pipe, action in zip(self.pipes, actions):
+            pipe.send(("step", int(action)))
+        results = [pipe.recv() for pipe in self.pipes]
+
+        observations, rewards, dones, infos = [], [], [], []
+        for index, (observation, reward, done, info) in enumerate(results):
+            if done:
+                info["final_observation"] = observation
+                self.pipes[index].send(("reset", self.next_seed(index)))
+                observation = self.pipes[index].recv()
+            observations.append(observation)
+            rewards.append(reward)
+            dones.append(done)
+            infos.append(info)
+        return np.stack(observations), np.array(rewards), np.array(dones), infos
+
+    def close(self):
+        for pipe in self.pipes:
+            pipe.send(("close", None))
+            pipe.recv()
+        for process in self.processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--envs", default="1,2,4", help="comma separated numbers of envs to time")
+    optParser.add_option("--steps", type="int", default=200, help="env steps per run (random actions)")
+    optParser.add_option("--decision", type="int", default=DECISION, help="sumo steps per env step")
+    options, args = optParser.parse_args()
+
+    print("envs, samples/s, sumo steps/s ({0} cores)".format(os.cpu_count()))
+    random = np.random.default_rng(0)
+    greens = len(load_junction(NET).greens)
+    for count in [int(value) for value in options.envs.split(",")]:
+        envs = VectorEnv(count, decision=options.decision)
+        observations = envs.reset()
+        start = time.perf_counter()
+        for step in range(options.steps):
+            observations, rewards, dones, infos = envs.step(random.integers(0, greens, count))
+        elapsed = time.perf_counter() - start
+        envs.close()
+        print("{0}, {1:.0f}, {2:.0f}".format(count, count * options.steps / elapsed, count * options.steps * options.decision / elapsed))
@@ -0,0 +1,233 @@
+import time
+import optparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import traci.constants as tc  # noqa, only the constants, no sumo needed
+
+from junction import load_junction
+from mpc import arrival_rates
+from fastsim import ROUTES
+from telemetry import LANE_VARS, NUMBER, LENGTH, SPEED, WAITING
+
+# stand-in for traci, to run runner.algorithm(conn=FakeTraci(...)) and runner.fixed(conn=...) without sumo,
+# for benchmarks of the python side and for regression runs on any box.
+#
+# it has the calls runner.py makes: lane / trafficlight / simulation subscribe and getSubscriptionResults,
+# the getters of the old loops, trafficlight.setPhase / setPhaseDuration / getPhase, simulationStep and close.
+# the traffic light runs the tlLogic program of the net like sumo does (setPhase starts a phase with its
+# duration from the net, setPhaseDuration changes what is left of it).
+#
+# the lanes are either
+#   - a queue model, per lane and per second: seeded poisson arrivals with the rates of the flows in
+#     T.rou.xml (mpc.arrival_rates), SATURATION vehicles leave a lane that has green, the lane holds
+#     length / SPACE vehicles and the rest wait to be inserted, like sumo's insertion buffer.
+#     queued vehicles add 1 s to the waiting time each, the ones that leave take their share of it with them.
+#   - or a trace recorded from sumo (--record), played back step by step whatever the controller does.
+#     that's open loop, the decisions don't change the traffic, but every value is a real one.
+#
+# latency is added to every call that is a round-trip in real traci (not the getSubscriptionResults,
+# those are read from the last step's reply), step_latency to every simulationStep, busy-waiting so
+# that microseconds are microseconds.
+#
+# python faketraci.py --controller algorithm --latency 40 --step-latency 200
+# python faketraci.py --record results/trace.npz      (needs sumo)
+# python faketraci.py --trace results/trace.npz
+
+NET = "data/T.net.xml"
+SATURATION = 1      # vehicles per second leaving a lane with green
+SPACE = 7.5         # m per queued vehicle, 5 m long + 2.5 m gap (sumo's default minGap)
+SPEED_FREE = 13.89  # mean speed of a lane with green
+
+
+def wait(seconds):
+    if seconds > 0:
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+
+class Domain:
+    def __init__(self, conn):
+        self.conn = conn
+        self.subscribed = {}    # id -> vars
+
+    def subscribe(self, id, vars=None):
+        self.conn.call()
+        self.subscribed[id] = tuple(vars)
+
+    def getSubscriptionResults(self, id):
+        return dict((var, self.conn.value(self, id, var)) for var in self.subscribed.get(id, ()))
+
+    def getAllSubscriptionResults(self):
+        return dict((id, self.getSubscriptionResults(id)) for id in self.subscribed)
+
+    def get(self, id, var):
+        self.conn.call()
+        return self.conn.value(self, id, var)
+
+
+class LaneDomain(Domain):
+    def getLastStepVehicleNumber(self, id):
+        return int(self.get(id, tc.LAST_STEP_VEHICLE_NUMBER))
+
+    def getLastStepLength(self, id):
+        return self.get(id, tc.LAST_STEP_LENGTH)
+
+    def getLastStepMeanSpeed(self, id):
+        return self.get(id, tc.LAST_STEP_MEAN_SPEED)
+
+    def getWaitingTime(self, id):
+        return self.get(id, tc.VAR_WAITING_TIME)
+
+
+class TrafficLightDomain(Domain):
+    def getPhase(self, id):
+        return self.get(id, tc.TL_CURRENT_PHASE)
+
+    def setPhase(self, id, phase):
+        self.conn.call()
+        self.conn.set_phase(phase)
+
+    def setPhaseDuration(self, id, duration):
+        self.conn.call()
+        self.conn.remaining = duration
+
+
+class SimulationDomain(Domain):
+    def subscribe(self, vars=None):
+        Domain.subscribe(self, "", vars)
+
+    def getSubscriptionResults(self, id=""):
+        return Domain.getSubscriptionResults(self, id)
+
+    def getArrivedNumber(self):
+        return self.get("", tc.VAR_ARRIVED_VEHICLES_NUMBER)
+
+    def getTime(self):
+        return self.get("", tc.VAR_TIME)
+
+
+class FakeTraci:
+    def __init__(self, junction, net=NET, routes=ROUTES, trace=None, latency=0.0, step_latency=0.0, seed=42):
+        # junction from junction.load_junction(net), trace is a file written by record(), latencies in seconds
+        self.junction = junction
+        self.latency = latency
+        self.step_latency = step_latency
+        self.random = np.random.default_rng(seed)
+        self.lane = LaneDomain(self)
+        self.trafficlight = TrafficLightDomain(self)
+        self.simulation = SimulationDomain(self)
+        self.index = dict((lane, index) for index, lane in enumerate(junction.lanes))
+        self.calls = 0
+
+        self.trace = None
+        if trace is not None:
+            with np.load(trace) as values:
+                self.trace = {"lanes": values["lanes"], "arrived": values["arrived"]}
+        self.rates = arrival_rates(junction, net, routes)
+        lengths = dict((lane.get("id"), float(lane.get("length"))) for lane in ET.parse(net).getroot().iter("lane"))
+        self.capacity = np.array([int(lengths[lane] / SPACE) for lane in junction.lanes])
+        self.queue = np.zeros(len(junction.lanes), dtype=int)
+        self.buffer = np.zeros(len(junction.lanes), dtype=int)   # vehicles not inserted yet
+        self.waiting = np.zeros(len(junction.lanes))
+        self.lanes = np.zeros((len(junction.lanes), len(LANE_VARS)))
+        self.arrived = 0
+        self.time = 0
+        self.set_phase(0)
+
+    def call(self):
+        # one round-trip
+        self.calls += 1
+        wait(self.latency)
+
+    def set_phase(self, phase):
+        self.phase = phase % len(self.junction.states)
+        self.remaining = self.junction.durations[self.phase]
+
+    def value(self, domain, id, var):
+        if domain is self.lane:
+            return self.lanes[self.index[id], LANE_VARS.index(var)]
+        if domain is self.trafficlight:
+            return self.phase
+        if var == tc.VAR_ARRIVED_VEHICLES_NUMBER:
+            return self.arrived
+        return float(self.time)
+
+    def simulationStep(self, step=0.0):
+        self.calls += 1
+        wait(self.step_latency)
+        self.time += 1
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.set_phase(self.phase + 1)
+
+        if self.trace is not None:
+            step = min(self.time - 1, len(self.trace["lanes"]) - 1)
+            self.lanes = self.trace["lanes"][step]
+            self.arrived = int(self.trace["arrived"][step])
+            return
+
+        green = self.junction.serves[self.phase]
+        self.waiting += self.queue
+        leaving = np.where(green, np.minimum(self.queue, SATURATION), 0)
+        self.waiting -= self.waiting * leaving / np.maximum(self.queue, 1)
+        self.buffer += self.random.poisson(self.rates)
+        inserted = np.minimum(self.buffer, self.capacity - self.queue + leaving)
+        self.buffer -= inserted
+        self.queue += inserted - leaving
+        self.arrived = int(leaving.sum())
+
+        self.lanes = np.zeros((len(self.queue), len(LANE_VARS)))
+        self.lanes[:, NUMBER] = self.queue
+        self.lanes[:, LENGTH] = np.where(self.queue > 0, SPACE - 2.5, 0.0)
+        self.lanes[:, SPEED] = np.where(green | (self.queue == 0), SPEED_FREE, 0.0)
+        self.lanes[:, WAITING] = self.waiting
+
+    def close(self):
+        self.calls += 1
+        wait(self.latency)
+
+
+def record(output, cfg="data/T.sumocfg", net=NET, steps=3601):
+    # runs sumo with the net's own program and saves what the lane subscriptions give every step
+    from runner import checkBinary, traci
+    from telemetry import Telemetry
+    junction = load_junction(net)
+    traci.start([checkBinary('sumo'), "-c", cfg, "--no-step-log", "--no-warnings"])
+    telemetry = Telemetry(junction)
+    telemetry.subscribe()
+    lanes, arrived = [], []
+    for step in range(steps):
+        traci.simulationStep()
+        data = telemetry.read()
+        lanes.append(data["lanes"])
+        arrived.append(data["arrived"])
+    traci.close()
+    np.savez(output, lanes=np.array(lanes), arrived=np.array(arrived))
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--controller", default="algorithm", choices=["algorithm", "fixed"])
+    optParser.add_option("--latency", type="float", default=0.0, help="us per traci round-trip")
+    optParser.add_option("--step-latency", type="float", default=0.0, help="us per simulationStep on top of it")
+    optParser.add_option("--seed", type="int", default=42)
+    optParser.add_option("--trace", default=None, help="play back a trace written with --record instead of the queue model")
+    optParser.add_option("--record", default=None, help="record a trace from sumo (.npz) and stop")
+    optParser.add_option("--repeat", type="int", default=3, help="runs to time")
+    options, args = optParser.parse_args()
+
+    if options.record:
+        record(options.record)
+    else:
+        import runner
+        controller = getattr(runner, options.controller)
+        for run in range(options.repeat):
+            conn = FakeTraci(load_junction(NET), trace=options.trace, latency=options.latency / 1e6,
+                             step_latency=options.step_latency / 1e6, seed=options.seed)
+            start = time.perf_counter()
+            averages = controller(conn=conn, output=None)
+            elapsed = time.perf_counter() - start
+            print("{0}: {1:.0f} steps/s, {2} calls, averages {3}".format(options.controller, 3601 / elapsed, conn.calls, averages))
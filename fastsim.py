@@ -0,0 +1,217 @@
+import time
+import optparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from metrics import Metrics, FORMATS
+
+# headless version of the queue model in arduino/code.py, so controller experiments don't need sumo.
+# it runs many independent copies ("replicas") of the T-junction at once, every array is lanes x replicas,
+# and one step is one tick of the board (1 s).
+#
+# same as the board: the six-phase program of Junction.setPhase, Lane.tick (up to 2 actors leave a
+# go/caution lane per tick, lanes with turning actors only on even ticks), rebalanceLanes and the
+# phase 0 / phase 3 scores with A, B, C.
+# different from the board: the queues are counts, not timestamps. we keep the total waiting time of
+# each queue instead, and actors that leave (or change lane) take the average wait of their queue with them.
+#
+# arrivals come from the flows in data/T.rou.xml: a lane with rate r gets int(r) actors every tick plus one
+# more with probability r - int(r) (sumo inserts `number` flows evenly spaced, so this is close at 1 veh/s).
+# vehicles go to the board lanes of their approach that allow their direction, pedestrians to the crossing
+# over the road they walk to.
+
+ROUTES = "data/T.rou.xml"
+
+# lanes in the same order as the Junction() arguments in arduino/code.py
+LANES = ["VE > W  ", "VE > W/S", "VW > E  ", "VW > E/S", "VS > W/E", "VS > E  ", "PX West ", "PX East ", "PX South"]
+EW2, EW1, WE1, WE2, SX1, SE2, PW, PE, PS = range(9)
+VEHICLES = slice(EW2, SE2 + 1)  # the six vehicle lanes, what runner.py measures in sumo
+
+TURN_MODULUS = np.array([1, 2, 1, 2, 5, 1, 1, 1, 1])
+SINGLE = TURN_MODULUS == 1
+
+# rebalanceLanes(straight lane, straight + turn lane)
+STRAIGHT = [EW2, WE1, SE2]
+TURN = [EW1, WE2, SX1]
+# it moves min(gap // 2, gap // turn modulus) actors, only when gap > 0, i.e. gap // the larger of the two
+SHARE = np.maximum(2, TURN_MODULUS[TURN]).astype(np.float32)[:, None]
+
+# lane state per phase (0 = stop, 1 = go, 2 = caution), and the countdown set when the phase starts
+PHASES = np.array([
+    [1, 1, 1, 1, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 0, 0, 0, 0, 0],
+    [2, 2, 2, 2, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 1, 1, 1, 0],
+    [0, 0, 0, 0, 1, 1, 0, 0, 0],
+    [0, 0, 0, 0, 2, 2, 0, 0, 0],
+])
+COUNTDOWN = np.array([30, 5, 2, 30, 5, 2])
+EXTENSION = 30
+
+# lanes that let actors out in each phase (lanes x phases), on even and on odd ticks (turning lanes only go on even ticks)
+# (float, so picking the column of every replica's phase is one np.take and the product stays float32)
+MOVING = [(PHASES > 0).T.astype(np.float32), ((PHASES > 0) & SINGLE).T.astype(np.float32)]
+
+PHASE0 = [WE1, WE2, EW1, EW2, PS]
+PHASE3 = slice(SX1, PE + 1)  # SX1, SE2, PW, PE
+
+# sumo edges -> side of the junction, and which board lanes take each (from, to) movement
+SIDES = {"gneE19": "W", "-gneE19": "W", "gneE20": "E", "-gneE20": "E", "gneE21": "S", "-gneE21": "S"}
+MOVEMENTS = {
+    ("E", "W"): [EW2, EW1], ("E", "S"): [EW1],
+    ("W", "E"): [WE1, WE2], ("W", "S"): [WE2],
+    ("S", "W"): [SX1], ("S", "E"): [SX1, SE2],
+}
+CROSSINGS = {"W": PW, "E": PE, "S": PS}
+
+
+def flow_rate(flow, span=None):
+    # actors per second for a <flow> or <personFlow>. with span, averaged over the first span seconds,
+    # for route files where a movement is several flows one after the other (the profiles of demand.py)
+    begin, end = float(flow.get("begin", 0)), float(flow.get("end", 3600))
+    if flow.get("number") is not None:
+        rate = float(flow.get("number")) / (end - begin)
+    elif flow.get("vehsPerHour") is not None:
+        rate = float(flow.get("vehsPerHour")) / 3600
+    elif flow.get("personsPerHour") is not None:
+        rate = float(flow.get("personsPerHour")) / 3600
+    elif flow.get("period", "").startswith("exp("):
+        rate = float(flow.get("period")[4:-1])     # poisson arrivals with this rate
+    elif flow.get("period") is not None:
+        rate = 1 / float(flow.get("period"))
+    else:
+        rate = float(flow.get("probability"))
+    if span is None:
+        return rate
+    return rate * max(0.0, min(end, span) - min(begin, span)) / span
+
+
+def flow_span(root):
+    # seconds from 0 to the end of the last flow of a route file
+    return max(float(flow.get("end", 3600)) for flow in list(root.iter("flow")) + list(root.iter("personFlow")))
+
+
+def load_rates(routefile=ROUTES):
+    # arrival rate per lane (actors per second), the mean over the whole route file
+    rates = np.zeros(len(LANES))
+    root = ET.parse(routefile).getroot()
+    span = flow_span(root)
+    for flow in root.iter("flow"):
+        lanes = MOVEMENTS[(SIDES[flow.get("from")], SIDES[flow.get("to")])]
+        rates[lanes] += flow_rate(flow, span) / len(lanes)
+    for flow in root.iter("personFlow"):
+        trip = flow.find("personTrip")
+        rates[CROSSINGS[SIDES[trip.get("to")]]] += flow_rate(flow, span)
+    return rates
+
+
+class FastSim:
+    def __init__(self, replicas=1000, rates=None, A=2, B=2, C=1, seed=None):
+        self.replicas = replicas
+        self.rates = load_rates() if rates is None else np.asarray(rates, dtype=float)
+        self.A, self.B, self.C = A, B, C
+        self.rng = np.random.default_rng(seed)
+        self.base = np.floor(self.rates).astype(np.float32)[:, None]
+        self.extra = (self.rates - np.floor(self.rates)).astype(np.float32)[:, None]
+        self.random = np.flatnonzero(self.extra)     # lanes that need a random number per tick (not the ones at 1 veh/s)
+        self.step_count = 0
+
+        # lanes x replicas, so a lane (or a run of lanes like VEHICLES) is a contiguous row
+        shape = (len(LANES), replicas)
+        self.queue = np.zeros(shape, dtype=np.float32)    # actors waiting per lane
+        self.wait = np.zeros(shape, dtype=np.float32)     # total seconds waited by the actors in the queue
+        self.hunger = np.zeros(shape, dtype=np.float32)
+        self.phase = np.zeros(replicas, dtype=int)
+        self.countdown = np.full(replicas, COUNTDOWN[0])
+
+        # setup() on the board starts with setPhase(0)
+        self.set_phase(np.ones(replicas, dtype=bool), self.phase)
+
+    def set_phase(self, change, phase):
+        # Junction.setPhase for the replicas in `change`: go lanes get hunger 0, everything else +1
+        go = PHASES.T[:, phase[change]] == 1
+        self.hunger[:, change] = np.where(go, 0, self.hunger[:, change] + 1)
+        self.phase[change] = phase[change]
+
+    def mean_wait(self):
+        # Lane.waitingTime, an empty queue has no waiting time left so this is 0 there
+        return self.wait / np.maximum(self.queue, 1)
+
+    def scores(self):
+        meanwait = self.mean_wait()
+        return (self.A * self.queue[PHASE0].sum(0) + self.B * meanwait[PHASE0].sum(0) + self.C * self.hunger[WE1] / 4,
+                self.A * self.queue[PHASE3].sum(0) + self.B * meanwait[PHASE3].sum(0) + self.C * self.hunger[SX1] / 2)
+
+    def move(self, count, source, target=None):
+        # take `count` actors out of lane(s) `source`, with their share of the waiting time
+        share = self.wait[source] * count / np.maximum(self.queue[source], 1)
+        self.queue[source] -= count
+        self.wait[source] -= share
+        if target is not None:
+            self.queue[target] += count
+            self.wait[target] += share
+
+    def step(self):
+        # one Junction.tick(), returns (waiting time, queue length, departures, phase) per replica
+        self.wait += self.queue
+        self.queue += self.base
+        self.queue[self.random] += self.rng.random((len(self.random), self.replicas), dtype=np.float32) < self.extra[self.random]
+
+        straight, turn = self.queue[STRAIGHT], self.queue[TURN]
+        gap = turn - straight
+        # np.floor(a / b) and not a // b, float // is ~40x slower in numpy and the counts are whole numbers anyway
+        count = np.floor(gap / SHARE) * (straight < turn / 4)
+        self.move(count, TURN, STRAIGHT)
+
+        leaving = np.minimum(self.queue, 2) * np.take(MOVING[self.step_count % 2], self.phase, axis=1)
+        self.move(leaving, slice(None))
+        self.hunger *= ~((leaving > 0) & SINGLE[:, None])
+
+        p0, p3 = self.scores()
+        expired = self.countdown <= 0
+        stay = expired & (((self.phase == 0) & (p0 > p3)) | ((self.phase == 3) & (p3 > p0)))
+        change = expired & ~stay
+        following = (self.phase + 1) % len(PHASES)
+        self.set_phase(change, following)
+        self.countdown = np.where(stay, EXTENSION, np.where(change, COUNTDOWN[following], self.countdown - 1))
+        self.step_count += 1
+
+        volume = self.queue[VEHICLES].sum(0)
+        waiting = self.wait[VEHICLES].sum(0) / np.maximum(volume, 1)
+        return waiting, volume / len(LANES[VEHICLES]), leaving[VEHICLES].sum(0), self.phase
+
+    def run(self, steps, output=None, format="csv", trace=0):
+        # runs `steps` ticks and returns the average waiting time, queue length and departure rate per replica.
+        # the per-step rows of replica `trace` go to output (same columns as runner.py)
+        totals = np.zeros((self.replicas, 3))
+        with Metrics(output, format) as metrics:
+            for step in range(steps):
+                waiting, queue, departed, phase = self.step()
+                totals[:, 0] += waiting
+                totals[:, 1] += queue
+                totals[:, 2] += departed
+                if output is not None:
+                    metrics.append([step, waiting[trace], queue[trace], departed[trace], phase[trace]])
+        return totals / steps
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--replicas", type="int", default=5000, help="junctions simulated at once (more per numpy call is faster up to ~10k)")
+    optParser.add_option("--steps", type="int", default=3600, help="ticks (seconds) per replica")
+    optParser.add_option("--routes", default=ROUTES, help="route file with the flows")
+    optParser.add_option("--seed", type="int", default=None)
+    optParser.add_option("--output", default=None, help="per-step results of the first replica, without extension")
+    optParser.add_option("--format", default="csv", choices=FORMATS)
+    options, args = optParser.parse_args()
+
+    sim = FastSim(options.replicas, load_rates(options.routes), seed=options.seed)
+    start = time.perf_counter()
+    averages = sim.run(options.steps, options.output, options.format)
+    elapsed = time.perf_counter() - start
+
+    print("average waiting time, average queue length, average departure rate")
+    print(", ".join(str(value) for value in averages.mean(0)))
+    print("{0:.0f} simulated hours in {1:.2f} s ({2:.0f} hours/s)".format(
+        options.replicas * options.steps / 3600, elapsed, options.replicas * options.steps / 3600 / elapsed))
@@ -0,0 +1,102 @@
+import os
+import sys
+import shutil
+import optparse
+import tempfile
+import subprocess
+import multiprocessing
+
+from runner import traci, algorithm, NET  # runner sets up the SUMO_HOME path
+from sweep import CFG, sumo_command, quiet
+from snapshot import load_snapshot
+from sumolib.miscutils import getFreeSocketPort  # noqa
+
+# what-if branches of runner.algorithm(): run the warm-up once, save a snapshot (see snapshot.py),
+# then every (A, B, C, interval) carries on from there in its own headless sumo instead of from step 0.
+#
+# python fork.py --warmup 1800 --policies 1,1,1,47 --policies 2,2,1,30 --jobs 4
+# python fork.py --state results/warmup.xml --policies 1,1,2,47   (fork again from an existing snapshot)
+
+COLUMNS = ["A", "B", "C", "interval", "average waiting time", "average queue length", "average departure rate"]
+
+
+def start(label, seed, outdir):
+    # the snapshot has to carry the random number generators and the pedestrians too, and positions and
+    # speeds with more than the default 2 decimals, or the branches drift away from the run they came from
+    options = ["--save-state.rng", "--save-state.transportables", "--save-state.precision", "8"]
+    traci.start(sumo_command(CFG, seed, outdir) + options, port=getFreeSocketPort(), label=label,
+                stdout=subprocess.DEVNULL)
+    return traci.getConnection(label)
+
+
+def warm_up(steps, state, A=1, B=1, C=1, interval=47, seed=23423):
+    # runs algorithm() up to `steps` and returns the snapshot, written to `state` (and state + ".json").
+    # sumo puts --output-prefix between the directory and the name of the state file, and sumo_command's
+    # prefix is relative to the config's directory, so "data/state.xml" ends up in outdir
+    outdir = tempfile.mkdtemp(prefix="warmup-")
+    try:
+        snapshot = algorithm(NET, A, B, C, interval, start("warmup", seed, outdir), output=None,
+                             checkpoint=(steps, os.path.join(os.path.dirname(CFG), "state.xml")))
+        shutil.move(os.path.join(outdir, "state.xml"), state)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    snapshot.state = os.path.abspath(state)
+    snapshot.write()
+    return snapshot
+
+
+def branch(job):
+    index, snapshot, (A, B, C, interval) = job
+    label = "branch-{0}".format(index)
+    outdir = tempfile.mkdtemp(prefix=label + "-")
+    try:
+        averages = algorithm(NET, A, B, C, interval, start(label, 23423, outdir), output=None, resume=snapshot)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    return [A, B, C, interval] + averages
+
+
+def fork(snapshot, policies, jobs=None):
+    # one row per policy, the averages are over the whole run (warm-up included)
+    work = [(index, snapshot, policy) for index, policy in enumerate(policies)]
+    with multiprocessing.Pool(jobs or min(len(work), os.cpu_count()), initializer=quiet) as pool:
+        return pool.map(branch, work)
+
+
+def policy(text):
+    A, B, C, interval = text.split(",")
+    return float(A), float(B), float(C), int(interval)
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--warmup", type="int", default=1800, help="steps run once before the branches")
+    optParser.add_option("--warmup-policy", default="1,1,1,47", help="A,B,C,interval during the warm-up")
+    optParser.add_option("--seed", type="int", default=23423, help="sumo seed of the warm-up")
+    optParser.add_option("--state", default=None,
+                         help="snapshot file, written by the warm-up or, if it exists, forked from without one")
+    optParser.add_option("--policies", action="append", default=[], help="A,B,C,interval of a branch, repeat for more")
+    optParser.add_option("--jobs", type="int", default=None, help="worker processes (default: all cores)")
+    options, args = optParser.parse_args()
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    policies = [policy(text) for text in options.policies] or [policy(options.warmup_policy)]
+
+    if options.state is not None and os.path.exists(options.state + ".json"):
+        snapshot = load_snapshot(os.path.abspath(options.state))
+    else:
+        state = options.state or os.path.join(tempfile.mkdtemp(prefix="fork-"), "warmup.xml")
+        A, B, C, interval = policy(options.warmup_policy)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')  # algorithm() prints every green extension
+        try:
+            snapshot = warm_up(options.warmup, state, A, B, C, interval, options.seed)
+        finally:
+            sys.stdout = stdout
+    print("snapshot at step {0}: {1}".format(snapshot.step, snapshot.state))
+
+    print(",".join(COLUMNS))
+    for row in fork(snapshot, policies, options.jobs):
+        print(",".join(str(value) for value in row))
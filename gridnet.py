@@ -0,0 +1,61 @@
+import os
+import sys
+import optparse
+import subprocess
+
+from runner import checkBinary  # runner sets up the SUMO_HOME path
+
+# synthetic test nets for network.py: a size x size grid where every junction has a traffic light,
+# random trips over it, and a sumo config for the two. ends up in <output>/grid.net.xml, grid.rou.xml
+# and grid.sumocfg.
+#
+# python gridnet.py --size 23 --output data/grid500    (~500 controlled junctions)
+
+CONFIG = """<?xml version="1.0" encoding="UTF-8"?>
+<configuration>
+    <input>
+        <net-file value="grid.net.xml"/>
+        <route-files value="grid.rou.xml"/>
+    </input>
+    <time>
+        <begin value="0"/>
+        <end value="{end}"/>
+    </time>
+</configuration>
+"""
+
+
+def generate(size, output="data/grid", length=200, period=None, end=3600, seed=42):
+    # period is the seconds between two new trips, by default about one per junction and 10 s
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    net = os.path.join(output, "grid.net.xml")
+    routes = os.path.join(output, "grid.rou.xml")
+
+    subprocess.check_call([checkBinary("netgenerate"), "--grid", "--grid.number", str(size), "--grid.length", str(length),
+                           "--default.lanenumber", "2", "--default-junction-type", "traffic_light",
+                           "--no-turnarounds", "true", "--output-file", net, "--seed", str(seed)],
+                          stdout=subprocess.DEVNULL)
+    randomtrips = os.path.join(os.environ["SUMO_HOME"], "tools", "randomTrips.py")
+    subprocess.check_call([sys.executable, randomtrips, "--net-file", net, "--route-file", routes,
+                           "--output-trip-file", os.path.join(output, "grid.trips.xml"), "--end", str(end),
+                           "--period", str(period or 10.0 / (size * size)), "--fringe-factor", "10",
+                           "--validate", "--seed", str(seed)],
+                          stdout=subprocess.DEVNULL)
+
+    cfg = os.path.join(output, "grid.sumocfg")
+    with open(cfg, "w") as f:
+        f.write(CONFIG.format(end=end))
+    return cfg, net
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--size", type="int", default=10, help="junctions per side")
+    optParser.add_option("--length", type="float", default=200, help="edge length (m)")
+    optParser.add_option("--period", type="float", default=None, help="seconds between trips")
+    optParser.add_option("--end", type="int", default=3600)
+    optParser.add_option("--seed", type="int", default=42)
+    optParser.add_option("--output", default="data/grid", help="directory for the files")
+    options, args = optParser.parse_args()
+    print(generate(options.size, options.output, options.length, options.period, options.end, options.seed))
@@ -0,0 +1,104 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# junction model read from the .net.xml, so the controller doesn't need the lane ids and phase numbers typed in.
+#
+# for every traffic light we look at the <connection> records that have tl="<id>": link i of the
+# tlLogic state string belongs to the incoming lane <from>_<fromLane>. a phase serves a lane if one
+# of the lane's links is green (G or g) in that phase.
+#
+# a "green" is a phase that starts a block of phases serving the same lanes, e.g. for gneJ27:
+#   0 GGgrrrgGGrGr  green, gneE20_1 gneE20_2 gneE19_1 gneE19_2
+#   1 GGgrrrgGGrrr  (same lanes, pedestrians stopped)
+#   2 yyyrrryyyrrr
+#   3 rrrgggrrrGrG  green, gneE21_1 gneE21_2
+#   4 rrrgggrrrrrr
+#   5 rrryyyrrrrrr
+# leaving green g is done by switching to phase g + 1, which starts the rest of the program.
+
+
+class Junction:
+    def __init__(self, id, lanes, states, durations, greens, groups, serves):
+        self.id = id
+        self.lanes = lanes            # controlled incoming lanes, grouped by the green that serves them
+        self.states = states          # tlLogic state string per phase
+        self.durations = durations    # tlLogic duration per phase
+        self.greens = greens          # phase indices where a green starts
+        self.groups = groups          # one index array into lanes per green
+        self.serves = serves          # phases x lanes, True where the lane has a green link in that phase
+
+    def group(self, phase):
+        # index of the green for this phase, -1 if the phase isn't a green
+        if phase in self.greens:
+            return self.greens.index(phase)
+        return -1
+
+
+def served(state, links):
+    # lanes with at least one green link in this phase state
+    return set(lane for index, lane in links.items() if state[index] in "Gg")
+
+
+def tl_links(root):
+    # traffic light id -> {link index -> incoming lane}, for all of them in one pass over the connections
+    links = {}
+    for connection in root.iter("connection"):
+        if connection.get("tl") is not None and not connection.get("from").startswith(":"):
+            lane = connection.get("from") + "_" + connection.get("fromLane")
+            links.setdefault(connection.get("tl"), {})[int(connection.get("linkIndex"))] = lane
+    return links
+
+
+def parse(root, id, logic=None, links=None, node=None):
+    # logic, links and node are looked up in root if not given (load_junctions gives them, for big nets)
+    if logic is None:
+        logic = root.find("tlLogic[@id='{0}']".format(id))
+    if logic is None:
+        raise ValueError("no tlLogic {0} in the net".format(id))
+    states = [phase.get("state") for phase in logic.iter("phase")]
+    durations = [float(phase.get("duration")) for phase in logic.iter("phase")]
+
+    if links is None:
+        links = tl_links(root).get(id, {})  # link index -> incoming lane
+
+    greens, lanesets = [], []
+    for phase, state in enumerate(states):
+        lanes = served(state, links)
+        if lanes and lanes != served(states[phase - 1], links):
+            greens.append(phase)
+            lanesets.append(lanes)
+
+    # keep the order the lanes come in on the junction (incLanes)
+    if node is None:
+        node = root.find("junction[@id='{0}']".format(id))
+    order = node.get("incLanes").split() if node is not None else sorted(links.values())
+    lanes = []
+    for laneset in lanesets:
+        lanes += [lane for lane in order if lane in laneset and lane not in lanes]
+    groups = [np.array([lanes.index(lane) for lane in order if lane in laneset]) for laneset in lanesets]
+    serves = np.array([[lane in served(state, links) for lane in lanes] for state in states])
+
+    return Junction(id, lanes, states, durations, greens, groups, serves)
+
+
+def load_junction(netfile, id=None):
+    # id=None takes the first traffic light in the net
+    root = ET.parse(netfile).getroot()
+    if id is None:
+        id = root.find("tlLogic").get("id")
+    return parse(root, id)
+
+
+def load_junctions(netfile):
+    # every traffic light in the net (the first program of each), in the order of the tlLogics
+    root = ET.parse(netfile).getroot()
+    links = tl_links(root)
+    nodes = dict((node.get("id"), node) for node in root.iter("junction"))
+    junctions, seen = [], set()
+    for logic in root.iter("tlLogic"):
+        id = logic.get("id")
+        if id not in seen:
+            seen.add(id)
+            junctions.append(parse(root, id, logic, links.get(id, {}), nodes.get(id)))
+    return junctions
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import hashlib
+import optparse
+import tempfile
+
+# results of runs we already did, so a sweep point or a montecarlo seed that was run before comes back
+# from disk instead of from another 3600 steps of sumo.
+#
+# the key of a run is a hash of everything that decides its averages: the controller and its parameters
+# (weights, decision interval, ...), the seed and the extra sumo options, the contents of the scenario
+# files (T.sumocfg, T.net.xml, T.rou.xml, T.add.xml or the route file given), the sources of the controller
+# (runner.py and what it imports) and of the scripts that make sumo's command line and run it (seed,
+# --random-depart-offset, --output-prefix, the warm reset), and the sumo binary. change any of it and
+# the old entries just stop being hit. file contents are hashed once per process and file version (mtime, size).
+#
+# an entry is a small json in results/cache/<2 chars>/<key>.json, its mtime is when it was last used.
+# evict() removes what wasn't used for --max-age days, then the least recently used until the cache is
+# under --max-size MB. sweep.py and montecarlo.py call it at the end of a run.
+#
+# python memo.py
+# python memo.py --evict --max-size 50 --max-age 7
+
+CACHE = "results/cache"
+MAX_SIZE = 100 * 2 ** 20    # bytes
+MAX_AGE = 30 * 86400        # s
+SCENARIO = ["data/T.sumocfg", "data/T.net.xml", "data/T.rou.xml", "data/T.add.xml"]
+SOURCES = ["runner.py", "junction.py", "telemetry.py", "metrics.py",
+           "sweep.py", "montecarlo.py", "pool.py", "backend.py"]    # next to this file
+
+digests = {}    # (path, mtime, size) -> sha1 of the contents
+
+
+def digest(path):
+    stat = os.stat(path)
+    version = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if version not in digests:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2 ** 20), b""):
+                sha.update(block)
+        digests[version] = sha.hexdigest()
+    return digests[version]
+
+
+def sumo_binary():
+    # path and version of the sumo binary (mtime and size, hashing ~50 MB every time would cost more than it saves)
+    from runner import checkBinary
+    binary = os.path.realpath(checkBinary('sumo'))
+    stat = os.stat(binary)
+    return [binary, stat.st_mtime_ns, stat.st_size]
+
+
+def key(controller, params, seed, options=(), routes=None):
+    # controller is a name ("algorithm", "fixed"), params the keyword arguments it gets, options more sumo options
+    here = os.path.dirname(os.path.abspath(__file__))
+    files = SCENARIO + ([routes] if routes is not None else [])
+    parts = {
+        "controller": controller,
+        "params": params,
+        "seed": seed,
+        "options": [str(option) for option in options],
+        "files": [digest(path) for path in files],
+        "sources": [digest(os.path.join(here, source)) for source in SOURCES],
+        "sumo": sumo_binary(),
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class Memo:
+    def __init__(self, directory=CACHE, max_size=MAX_SIZE, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        # the averages stored for this key, or None
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                averages = json.load(f)["averages"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return averages
+
+    def put(self, key, averages, info=None):
+        # info (the params, ...) is only stored to make the files readable
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(handle, 'w') as f:
+            json.dump({"averages": averages, "info": info, "created": time.time()}, f)
+        os.replace(temporary, path)
+
+    def entries(self):
+        # (last used, size, path) of every entry
+        entries = []
+        for root, directories, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        # returns the number of entries removed
+        entries = sorted(self.entries())
+        oldest = time.time() - self.max_age
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for used, bytes, path in entries:
+            if used >= oldest and size <= self.max_size:
+                break
+            os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))     # only goes if it was the last one in there
+            except OSError:
+                pass
+            size -= bytes
+            removed += 1
+        return removed
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--directory", default=CACHE)
+    optParser.add_option("--evict", action="store_true", default=False)
+    optParser.add_option("--max-size", type="float", default=MAX_SIZE / 2 ** 20, help="MB")
+    optParser.add_option("--max-age", type="float", default=MAX_AGE / 86400, help="days")
+    options, args = optParser.parse_args()
+
+    memo = Memo(options.directory, int(options.max_size * 2 ** 20), options.max_age * 86400)
+    if options.evict:
+        print("{0} entries removed".format(memo.evict()))
+    entries = memo.entries()
+    print("{0} entries, {1:.1f} MB".format(len(entries), sum(entry[1] for entry in entries) / 2 ** 20))
@@ -0,0 +1,97 @@
+import csv
+import struct
+
+import numpy as np
+
+# streaming sink for the per-step rows of runner.algorithm() / runner.fixed().
+# rows are buffered and written every `buffer` rows, and the column sums are kept as we go,
+# so memory stays the same no matter how long the run is.
+#
+# formats:
+#   csv      output.csv, same as before
+#   npy      output.npy, one float64 record per row with the column names as fields,
+#            np.load(path, mmap_mode="r") opens it without reading it all in
+#   parquet  output.parquet, one row group per buffer (needs pyarrow)
+
+COLUMNS = ["time", "waiting time", "queue length", "departure rate", "phase"]
+FORMATS = ["csv", "npy", "parquet"]
+
+
+def npy_header(dtype, rows, size):
+    # .npy version 1.0 header padded to a fixed size so it can be rewritten with the final row count
+    header = repr({'descr': dtype.descr, 'fortran_order': False, 'shape': (rows,)})
+    header = header.ljust(size - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class Metrics:
+    def __init__(self, output=None, format="csv", columns=COLUMNS, buffer=1024):
+        # output is the file name without extension, None only keeps the aggregates
+        if format not in FORMATS:
+            raise ValueError("unknown metrics format {0}, use one of {1}".format(format, FORMATS))
+        self.columns = columns
+        self.format = format
+        self.buffer = buffer
+        self.rows = []
+        self.count = 0
+        self.sums = [0] * len(columns)
+        self.path = None if output is None else output + "." + format
+        self.file = None
+        self.writer = None
+
+        if self.path is None:
+            return
+        if format == "csv":
+            self.file = open(self.path, 'w')
+            self.writer = csv.writer(self.file, lineterminator="\n")
+            self.writer.writerow(columns)
+        elif format == "npy":
+            self.dtype = np.dtype([(column, '<f8') for column in columns])
+            self.header = (len(npy_header(self.dtype, 10 ** 19, 0)) // 64 + 1) * 64
+            self.file = open(self.path, 'wb')
+            self.file.write(npy_header(self.dtype, 0, self.header))
+        else:
+            import pyarrow  # noqa
+            import pyarrow.parquet  # noqa
+            self.schema = pyarrow.schema([(column, pyarrow.float64()) for column in columns])
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+
+    def append(self, row):
+        for i, value in enumerate(row):
+            self.sums[i] += value
+        self.count += 1
+        if self.path is not None:
+            self.rows.append(row)
+            if len(self.rows) >= self.buffer:
+                self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.format == "csv":
+            self.writer.writerows(self.rows)
+        elif self.format == "npy":
+            np.array([tuple(row) for row in self.rows], dtype=self.dtype).tofile(self.file)
+        else:
+            import pyarrow  # noqa
+            columns = list(zip(*self.rows))
+            self.writer.write_table(pyarrow.table({name: [float(value) for value in column] for name, column in zip(self.columns, columns)}, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.path is None:
+            return
+        self.flush()
+        if self.format == "npy":
+            self.file.seek(0)
+            self.file.write(npy_header(self.dtype, self.count, self.header))
+        if self.format == "parquet":
+            self.writer.close()
+        else:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,198 @@
+import os
+import shutil
+import optparse
+import tempfile
+import subprocess
+import multiprocessing
+from statistics import NormalDist
+
+import numpy as np
+
+from runner import traci, algorithm, fixed, NET  # runner sets up the SUMO_HOME path
+from sweep import CFG, sumo_command, quiet
+from sumolib.miscutils import getFreeSocketPort  # noqa
+
+# algorithm() vs fixed() over many sumo seeds, to see if the difference in dataalgoave.csv / datafixedave.csv
+# is more than the luck of one run. both controllers run every seed (paired, so the same random traffic
+# is compared), as many at once as there are workers. the means and variances are kept with Welford's
+# updates and we stop once the confidence interval of the waiting time difference is narrower than --width.
+#
+# the flows in T.rou.xml are evenly spaced (number=1800 over 3600 s), so on top of --seed the departures
+# get a random delay of up to --depart-offset seconds, otherwise only the pedestrians would change per seed.
+# with --demand the runs use route files of demand.py specs instead of T.rou.xml, made once and then
+# reused from data/demand. with a list of specs seed i (from --first-seed) gets spec i (round robin),
+# so e.g. the noise variants of demand.py --variants are the random part.
+#
+# python montecarlo.py --width 0.5 --max-seeds 200 --jobs 8
+# python montecarlo.py --demand '[{"noise": 0.2, "seed": 0}, {"noise": 0.2, "seed": 1}]'
+
+CONTROLLERS = {"algorithm": algorithm, "fixed": fixed}
+METRICS = ["average waiting time", "average queue length", "average departure rate"]
+COLUMNS = ["controller", "seed", "demand"] + METRICS
+
+
+class Welford:
+    # running mean and variance of a vector, one update per sample, nothing kept per sample
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def add(self, sample):
+        sample = np.asarray(sample, dtype=float)
+        self.count += 1
+        delta = sample - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (sample - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.full(len(self.mean), np.inf)
+
+    def halfwidth(self, confidence=0.95):
+        # normal approximation, which is why there is a --min-seeds
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return z * np.sqrt(self.variance() / max(self.count, 1))
+
+
+def run(job):
+    controller, seed, offset, routes = job
+    label = "mc-{0}-{1}".format(controller, seed)
+    outdir = tempfile.mkdtemp(prefix=label + "-")
+    try:
+        command = sumo_command(CFG, seed, outdir, routes) + ["--random-depart-offset", str(offset)]
+        traci.start(command, port=getFreeSocketPort(), label=label, stdout=subprocess.DEVNULL)
+        averages = CONTROLLERS[controller](NET, conn=traci.getConnection(label), output=None)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    return [controller, seed, routes] + averages
+
+
+class Cached:
+    # a run that came from the memo, looks like the AsyncResult of one that is done
+    def __init__(self, row):
+        self.row = row
+
+    def ready(self):
+        return True
+
+    def get(self):
+        return self.row
+
+
+def montecarlo(width=1.0, confidence=0.95, min_seeds=10, max_seeds=100, first_seed=0, offset=2.0, jobs=None,
+               output="results/montecarlo.csv", memo=None, routes=(None,)):
+    # returns the Welford stats of algorithm, fixed and algorithm - fixed (per seed), and the number of seeds used
+    # memo is a memo.Memo, runs it has aren't done again and the new ones go into it
+    # routes are the route files the seeds take in turn, None is the one of the config
+    jobs = jobs or os.cpu_count()
+    stats = {"algorithm": Welford(len(METRICS)), "fixed": Welford(len(METRICS)), "difference": Welford(len(METRICS))}
+    pending = {}    # seed -> the result of the controller that finished first
+    seeds = iter(range(first_seed, first_seed + max_seeds))
+    running = []
+    rows = []
+
+    def demand(seed):
+        return routes[(seed - first_seed) % len(routes)]
+
+    def key(controller, seed):
+        from memo import key
+        return key(controller, {}, seed, ["--random-depart-offset", offset], demand(seed))
+
+    def submit():
+        seed = next(seeds, None)
+        if seed is not None:
+            for controller in CONTROLLERS:
+                averages = memo.get(key(controller, seed)) if memo is not None else None
+                if averages is None:
+                    running.append(pool.apply_async(run, ((controller, seed, offset, demand(seed)),)))
+                else:
+                    running.append(Cached([controller, seed, demand(seed)] + averages))
+
+    def done():
+        difference = stats["difference"]
+        return difference.count >= min_seeds and 2 * difference.halfwidth(confidence)[0] < width
+
+    with multiprocessing.Pool(jobs, initializer=quiet) as pool:
+        # two runs per seed, keep every worker busy and no more (so stopping doesn't throw much away)
+        for i in range((jobs + 1) // 2):
+            submit()
+
+        while running and not done():
+            result = next((result for result in running if result.ready()), None)
+            if result is None:
+                running[0].wait(0.1)
+                continue
+            running.remove(result)
+            row = result.get()
+            rows.append(row)
+
+            controller, seed, averages = row[0], row[1], row[3:]
+            if memo is not None and not isinstance(result, Cached):
+                memo.put(key(controller, seed), averages, {"controller": controller, "seed": seed, "offset": offset,
+                                                           "demand": row[2]})
+            stats[controller].add(averages)
+            if seed in pending:
+                other = pending.pop(seed)
+                stats["difference"].add(np.subtract(averages, other) * (1 if controller == "algorithm" else -1))
+                report(stats, confidence)
+                submit()
+            else:
+                pending[seed] = averages
+        # leaving the with block terminates the runs we don't need anymore
+    if memo is not None:
+        memo.evict()
+
+    if output is not None:
+        with open(output, "w") as csvfile:
+            csvfile.write(",".join(COLUMNS) + "\n")
+            for row in sorted(rows, key=lambda row: (row[1], row[0])):
+                csvfile.write(",".join("" if value is None else str(value) for value in row) + "\n")
+
+    return stats, stats["difference"].count
+
+
+def report(stats, confidence=0.95):
+    difference = stats["difference"]
+    print("{0} seeds: waiting time algorithm {1:.3f}, fixed {2:.3f}, difference {3:.3f} +- {4:.3f}".format(
+        difference.count, stats["algorithm"].mean[0], stats["fixed"].mean[0],
+        difference.mean[0], difference.halfwidth(confidence)[0]))
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--width", type="float", default=1.0,
+                         help="stop when the confidence interval of the waiting time difference is narrower (s)")
+    optParser.add_option("--confidence", type="float", default=0.95)
+    optParser.add_option("--min-seeds", type="int", default=10, help="seeds before the interval is trusted")
+    optParser.add_option("--max-seeds", type="int", default=100, help="stop here even if the interval is wider")
+    optParser.add_option("--first-seed", type="int", default=0)
+    optParser.add_option("--depart-offset", type="float", default=2.0,
+                         help="random delay of every vehicle departure, up to this many seconds")
+    optParser.add_option("--demand", default=None,
+                         help="demand.py spec or list of specs (json or a json file), the seeds take them in turn")
+    optParser.add_option("--jobs", type="int", default=None, help="worker processes (default: all cores)")
+    optParser.add_option("--output", default="results/montecarlo.csv", help="per-seed results")
+    optParser.add_option("--no-cache", action="store_true", default=False,
+                         help="run every seed, even the ones in results/cache (memo.py)")
+    options, args = optParser.parse_args()
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    memo = None
+    if not options.no_cache:
+        from memo import Memo
+        memo = Memo()
+    routes = [None]
+    if options.demand is not None:
+        from demand import parse_demand
+        routes = parse_demand(options.demand, options.jobs)
+    stats, count = montecarlo(options.width, options.confidence, options.min_seeds, options.max_seeds,
+                              options.first_seed, options.depart_offset, options.jobs, options.output, memo, routes)
+
+    print("{0} seeds, {1:.0%} confidence intervals".format(count, options.confidence))
+    for name in ("algorithm", "fixed", "difference"):
+        halfwidths = stats[name].halfwidth(options.confidence)
+        print(name + ": " + ", ".join("{0} {1:.3f} +- {2:.3f}".format(metric, mean, halfwidth)
+                                     for metric, mean, halfwidth in zip(METRICS, stats[name].mean, halfwidths)))
@@ -0,0 +1,121 @@
+import time
+import itertools
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from fastsim import flow_rate, flow_span, ROUTES
+from metrics import Metrics
+from telemetry import NUMBER, WAITING
+
+# model-predictive alternative to algo() + green_duration() for runner.algorithm(mpc=MPC(...)).
+#
+# at a decision point we know how many vehicles are on each lane and how long they have waited (telemetry),
+# and we try every plan (stay in this green for d1 s, 0 = leave now, run the program to the next green,
+# hold that one for d2 s, run the program back, stay in this green until the end of the horizon) on a
+# queue model, per lane and per second:
+#   waiting += queue, then SATURATION * green(t) vehicles leave with their share of the waiting,
+#   then the arrivals (rates from the flows in the route file) join the queue
+# the plan with the least waiting summed over the horizon wins. counting waiting that keeps growing,
+# not just vehicles, is what stops it from starving the side road, like the waiting time term of algo().
+# we only carry out the first part of the plan (d1), the next decision plans again. all the plans are
+# rolled out together, one numpy step per second of the horizon.
+#
+# the green masks of every plan are worked out once per green in __init__, a decision is just the rollout,
+# so it stays well under the time sumo takes for one step. the latency of every decision is logged.
+
+SATURATION = 1.0    # vehicles per second a lane lets through on green, 0.5 and 0.8 did worse in sumo
+DURATIONS = (0, 5, 10, 15, 20, 30, 40)  # a stay shorter than the decision interval (47) really ends
+HORIZON = 90
+LOG_COLUMNS = ["time", "green", "duration", "cost", "latency"]
+
+
+def arrival_rates(junction, net, routes=ROUTES):
+    # vehicles per second per junction lane: a flow is split evenly over the lanes of its
+    # from-edge that have a connection to its to-edge
+    lanes = {}   # (from edge, to edge) -> junction lanes
+    for connection in ET.parse(net).getroot().iter("connection"):
+        if connection.get("tl") == junction.id and not connection.get("from").startswith(":"):
+            lane = connection.get("from") + "_" + connection.get("fromLane")
+            movement = lanes.setdefault((connection.get("from"), connection.get("to")), [])
+            if lane not in movement:
+                movement.append(lane)
+
+    rates = np.zeros(len(junction.lanes))
+    root = ET.parse(routes).getroot()
+    span = flow_span(root)  # the mean over the route file, demand.py cuts flows in intervals
+    for flow in root.iter("flow"):
+        movement = lanes.get((flow.get("from"), flow.get("to")), [])
+        for lane in movement:
+            rates[junction.lanes.index(lane)] += flow_rate(flow, span) / len(movement)
+    return rates
+
+
+class MPC:
+    def __init__(self, junction, net, routes=ROUTES, horizon=HORIZON, durations=DURATIONS,
+                 saturation=SATURATION, output=None):
+        # output is the decision log without extension (Metrics, csv), None doesn't write one
+        self.junction = junction
+        self.horizon = horizon
+        self.rates = arrival_rates(junction, net, routes)
+        self.saturation = saturation
+        self.plans = [(first, second) for first, second in itertools.product(durations, durations) if second > 0]
+        self.service = [self.schedule(green) * saturation for green in range(len(junction.greens))]
+        self.log = Metrics(output, columns=LOG_COLUMNS)
+        self.latencies = []
+
+    def program(self, green):
+        # (phase, duration) of the program from the end of this green to the start of the next one
+        phases = len(self.junction.states)
+        start = self.junction.greens[green]
+        end = self.junction.greens[(green + 1) % len(self.junction.greens)]
+        return [(phase % phases, int(self.junction.durations[phase % phases]))
+                for phase in range(start + 1, end if end > start else end + phases)]
+
+    def schedule(self, green):
+        # plans x horizon x lanes, 1 where the lane is green
+        following = (green + 1) % len(self.junction.greens)
+        masks = np.zeros((len(self.plans), self.horizon, len(self.junction.lanes)))
+        for index, (first, second) in enumerate(self.plans):
+            phases = [self.junction.greens[green]] * first
+            for phase, duration in self.program(green):
+                phases += [phase] * duration
+            phases += [self.junction.greens[following]] * second
+            for phase, duration in self.program(following):
+                phases += [phase] * duration
+            phases += [self.junction.greens[green]] * max(self.horizon - len(phases), 0)
+            masks[index] = self.junction.serves[phases[:self.horizon]]
+        return masks
+
+    def rollout(self, queue, waiting, green):
+        # cost of every plan, starting from the vehicles on the lanes now and their total waiting time
+        service = self.service[green]
+        queue = np.repeat(queue[None, :], len(self.plans), axis=0)
+        waiting = np.repeat(waiting[None, :], len(self.plans), axis=0)
+        cost = np.zeros(len(self.plans))
+        for t in range(self.horizon):
+            waiting += queue
+            leaving = np.minimum(queue, service[:, t])
+            waiting -= waiting * leaving / np.maximum(queue, 1)
+            queue += self.rates - leaving
+            cost += waiting.sum(1)
+        return cost
+
+    def decide(self, step, data, green):
+        # seconds to stay in this green, 0 means leave it now
+        start = time.perf_counter()
+        cost = self.rollout(data["lanes"][:, NUMBER], data["lanes"][:, WAITING], green)
+        best = int(np.argmin(cost))
+        duration = self.plans[best][0]
+        latency = (time.perf_counter() - start) * 1000
+        self.latencies.append(latency)
+        self.log.append([step, green, duration, cost[best], latency])
+        return duration
+
+    def close(self):
+        # closes the log and prints the decision latency (ms)
+        self.log.close()
+        if self.latencies:
+            latencies = np.array(self.latencies)
+            print("mpc: {0} decisions, latency p50 {1:.3f} ms, p99 {2:.3f} ms, max {3:.3f} ms".format(
+                len(latencies), np.percentile(latencies, 50), np.percentile(latencies, 99), latencies.max()))
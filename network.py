@@ -0,0 +1,160 @@
+import sys
+import optparse
+
+import numpy as np
+
+from runner import checkBinary, traci, finish  # runner sets up the SUMO_HOME path
+import traci.constants as tc  # noqa
+
+from junction import load_junctions
+from metrics import Metrics
+from telemetry import LANE_VARS, NUMBER, LENGTH, SPEED, WAITING
+
+# runner.algorithm() for every traffic light of a net at once.
+#
+# the lanes of all the junctions go in one array (rows of data["lanes"]) and the greens of all the
+# junctions are numbered one after the other ("groups"). which lanes a green serves is kept as
+# (lane, group) pairs, so the score of every green in the net is a few np.bincount calls and the
+# decision of every junction is one vectorized comparison, no python loop over junctions per step.
+# traci is only called for the junctions that actually get a setPhase / setPhaseDuration.
+#
+# junctions with less than two greens (e.g. the corners of a grid, always green) aren't controlled.
+#
+# python gridnet.py --size 10
+# python network.py --nogui --cfg data/grid/grid.sumocfg --net data/grid/grid.net.xml
+
+COLUMNS = ["time", "waiting time", "queue length", "departure rate", "decisions"]
+
+
+class Network:
+    def __init__(self, junctions):
+        self.junctions = [junction for junction in junctions if len(junction.greens) >= 2]
+        self.ids = [junction.id for junction in self.junctions]
+        self.lanes = []
+        member_lanes, member_groups = [], []
+        self.first = []         # per junction, its first group
+        self.phase_group = []   # per junction and phase (flat), the group of that phase or -1
+        self.phase_offset = []  # per junction, where its phases start in phase_group
+        self.green_phase = []   # per group, the phase index of that green
+        self.group_junction = []
+
+        for index, junction in enumerate(self.junctions):
+            lane_offset = len(self.lanes)
+            self.lanes += junction.lanes
+            self.first.append(len(self.green_phase))
+            self.phase_offset.append(len(self.phase_group))
+            self.phase_group += [-1 if junction.group(phase) < 0 else len(self.green_phase) + junction.group(phase)
+                                 for phase in range(len(junction.states))]
+            for green, group in zip(junction.greens, junction.groups):
+                member_lanes += list(group + lane_offset)
+                member_groups += [len(self.green_phase)] * len(group)
+                self.green_phase.append(green)
+                self.group_junction.append(index)
+
+        self.member_lanes = np.array(member_lanes, dtype=int)
+        self.member_groups = np.array(member_groups, dtype=int)
+        self.first = np.array(self.first)
+        self.count = np.array([len(junction.greens) for junction in self.junctions])
+        self.phases = np.array([len(junction.states) for junction in self.junctions])
+        self.phase_group = np.array(self.phase_group)
+        self.phase_offset = np.array(self.phase_offset)
+        self.green_phase = np.array(self.green_phase)
+        self.group_junction = np.array(self.group_junction)
+        self.size = np.bincount(self.member_groups, minlength=len(self.green_phase))   # n in algo()
+        self.hungerlevel = np.zeros(len(self.green_phase))
+
+    def subscribe(self, conn):
+        for lane in self.lanes:
+            conn.lane.subscribe(lane, LANE_VARS)
+        for id in self.ids:
+            conn.trafficlight.subscribe(id, (tc.TL_CURRENT_PHASE,))
+        conn.simulation.subscribe((tc.VAR_ARRIVED_VEHICLES_NUMBER,))
+
+    def read(self, conn):
+        # same as Telemetry.read() but "phase" is an array over the junctions
+        lanes = conn.lane.getAllSubscriptionResults()
+        lights = conn.trafficlight.getAllSubscriptionResults()
+        return {
+            "phase": np.array([lights[id][tc.TL_CURRENT_PHASE] for id in self.ids]),
+            "arrived": conn.simulation.getSubscriptionResults()[tc.VAR_ARRIVED_VEHICLES_NUMBER],
+            "lanes": np.array([[lanes[lane][var] for var in LANE_VARS] for lane in self.lanes], dtype=float),
+        }
+
+    def total(self, values):
+        # per group sum of a per lane value
+        return np.bincount(self.member_groups, weights=values[self.member_lanes], minlength=len(self.green_phase))
+
+    def scores(self, data, A=1, B=1, C=1):
+        # algo() for every green of every junction (the waiting time term is 0 for an empty green, like algo())
+        lanes = data["lanes"]
+        n = self.size
+        volume = self.total(lanes[:, NUMBER])
+        waitingtime = self.total(lanes[:, WAITING])
+        per_vehicle = np.divide(waitingtime, volume, out=np.zeros_like(waitingtime), where=volume > 0)
+        return ((A * volume / n) + (B * per_vehicle) + (C * n * self.hungerlevel)) / n
+
+    def green_duration(self, data):
+        # telemetry.green_duration() for every group
+        lanes = data["lanes"]
+        return (self.total(lanes[:, NUMBER] * lanes[:, LENGTH]) / (self.total(lanes[:, SPEED]) + 0.01)).astype(int)
+
+    def decide(self, data, A=1, B=1, C=1):
+        # the decision of algorithm() for every junction that is in a green:
+        # returns (junctions that leave their green, junctions that stay, the durations of the stays)
+        current = self.phase_group[self.phase_offset + data["phase"]]
+        green = np.flatnonzero(current >= 0)
+        current = current[green]
+        following = self.first[green] + (current - self.first[green] + 1) % self.count[green]
+
+        scores = self.scores(data, A, B, C)
+        leave = scores[following] > scores[current]
+        self.hungerlevel[current[leave]] += 5
+        self.hungerlevel[following[leave]] = 0
+        stay = ~leave
+        return green[leave], green[stay], self.green_duration(data)[current[stay]]
+
+
+def control(net, A=1, B=1, C=1, min=47, conn=traci, output="results/datanetwork", format="csv", T=3600):
+    # runner.algorithm() on every traffic light of the net, returns the averages like algorithm()
+    network = Network(load_junctions(net))
+    for id, junction in zip(network.ids, network.junctions):
+        conn.trafficlight.setPhase(id, junction.greens[0])
+    network.subscribe(conn)
+
+    metrics = Metrics(output, format, columns=COLUMNS)
+    step = 0
+    while step <= T:
+        conn.simulationStep()
+        data = network.read(conn)
+        decisions = 0
+        if step % min == 0:
+            leave, stay, durations = network.decide(data, A, B, C)
+            following = (data["phase"][leave] + 1) % network.phases[leave]
+            for index, phase in zip(leave, following):
+                conn.trafficlight.setPhase(network.ids[index], phase)
+            for index, duration in zip(stay, durations):
+                conn.trafficlight.setPhase(network.ids[index], data["phase"][index])
+                conn.trafficlight.setPhaseDuration(network.ids[index], duration)
+            decisions = len(leave) + len(stay)
+
+        waiting = data["lanes"][:, WAITING].sum()
+        volume = data["lanes"][:, NUMBER].sum()
+        metrics.append([step, waiting / volume if volume else 0.0, volume / len(network.lanes), data["arrived"], decisions])
+        step += 1
+
+    conn.close()
+    sys.stdout.flush()
+    return finish(metrics, output, T)
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--nogui", action="store_true", default=False, help="run the commandline version of sumo")
+    optParser.add_option("--cfg", default="data/grid/grid.sumocfg", help="sumo config, see gridnet.py")
+    optParser.add_option("--net", default="data/grid/grid.net.xml", help="the net in that config")
+    optParser.add_option("--output", default="results/datanetwork", help="per-step results, without extension")
+    options, args = optParser.parse_args()
+
+    sumoBinary = checkBinary('sumo' if options.nogui else 'sumo-gui')
+    traci.start([sumoBinary, "-c", options.cfg, "--no-step-log"])
+    print(control(options.net, output=options.output))
@@ -0,0 +1,166 @@
+import os
+import glob
+import hashlib
+import optparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+# readers for the files sumo writes: tripinfo.xml (runner.py), the full-output (results.xml, see
+# data/T.sumocfg) and the e1Detector_*.xml files of data/T.add.xml. they go through the xml with
+# iterparse and throw every element away once it's read, and the rows are collected per column in
+# numpy chunks, so memory is the size of the table, not of the xml tree.
+#
+# every table is cached as a pickle in a .cache directory next to the xml, the cache name has the
+# file's mtime and size in it, so a changed file is parsed again and the old cache entry is deleted.
+#
+#   python outputs.py tripinfo.xml
+#   python outputs.py data/results.xml --kind lane
+
+CHUNK = 65536
+
+
+class Columns:
+    # a table built one row (dict of xml attributes) at a time. the values of a chunk of rows are kept
+    # in lists, then turned into one float64 array per column (or object for text) and the lists dropped
+    def __init__(self, chunk=CHUNK):
+        self.chunk = chunk
+        self.names = []
+        self.values = {}
+        self.rows = 0       # in the current chunk
+        self.chunks = []    # (rows, {name: array})
+
+    def add(self, row):
+        for name in row:
+            if name not in self.values:
+                self.names.append(name)
+                self.values[name] = [None] * self.rows
+        for name, values in self.values.items():
+            values.append(row.get(name))
+        self.rows += 1
+        if self.rows >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.chunks.append((self.rows, dict((name, column(values)) for name, values in self.values.items())))
+        self.values = dict((name, []) for name in self.names)
+        self.rows = 0
+
+    def frame(self):
+        self.flush()
+        columns = {}
+        for name in self.names:
+            parts = [arrays[name] if name in arrays else np.full(rows, np.nan) for rows, arrays in self.chunks]
+            if any(part.dtype == object for part in parts):
+                parts = [part.astype(object) for part in parts]
+            columns[name] = np.concatenate(parts) if parts else np.array([])
+        return pd.DataFrame(columns, columns=self.names)
+
+
+def column(values):
+    # float64 if every value is a number (missing ones are nan), otherwise the strings as they are
+    try:
+        return np.array([np.nan if value is None or value == "" else float(value) for value in values])
+    except ValueError:
+        return np.array(values, dtype=object)
+
+
+def elements(path, tags):
+    # (element, timestep) for every element with one of these tags, timestep of the enclosing
+    # <data> (full-output) or None. an element is only valid until the next one is read
+    timestep = None
+    context = iter(ET.iterparse(path, events=("start", "end")))
+    event, root = next(context)
+    for event, element in context:
+        if event == "start":
+            if element.tag == "data":
+                timestep = float(element.get("timestep"))
+            continue
+        if element.tag in tags:
+            yield element, timestep
+        if element.tag in tags or element.tag == "data":
+            element.clear()
+            root.clear()    # drops the finished elements from the root, or the tree still grows
+
+
+def cache_path(path, kind):
+    # .cache/<name>.<kind>.<key>.pkl next to the file, key from the file's mtime and size
+    stat = os.stat(path)
+    key = hashlib.sha1("{0}:{1}".format(stat.st_mtime_ns, stat.st_size).encode()).hexdigest()[:16]
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+    return os.path.join(directory, "{0}.{1}.{2}.pkl".format(os.path.basename(path), kind, key))
+
+
+def cached(path, kind, parse, cache=True):
+    if not cache:
+        return parse()
+    target = cache_path(path, kind)
+    if os.path.exists(target):
+        return pd.read_pickle(target)
+
+    table = parse()
+    directory = os.path.dirname(target)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for old in glob.glob(os.path.join(directory, "{0}.{1}.*.pkl".format(glob.escape(os.path.basename(path)), kind))):
+        os.remove(old)
+    table.to_pickle(target)
+    return table
+
+
+def read_table(path, tags, timestep=False):
+    columns = Columns()
+    for element, step in elements(path, tags):
+        row = dict(element.attrib)
+        if timestep:
+            row["timestep"] = step
+        columns.add(row)
+    return columns.frame()
+
+
+def read_tripinfo(path="tripinfo.xml", persons=False, cache=True):
+    # one row per <tripinfo> (vehicles), or per <personinfo> with persons=True
+    kind = "personinfo" if persons else "tripinfo"
+    return cached(path, kind, lambda: read_table(path, (kind,)), cache)
+
+
+def read_detector(path, cache=True):
+    # the <interval> rows of an e1Detector file (begin, end, id, nVehContrib, flow, occupancy, speed, ...)
+    return cached(path, "interval", lambda: read_table(path, ("interval",)), cache)
+
+
+def read_detectors(directory="data", cache=True):
+    # all the e1Detector_*.xml files in a directory in one table
+    tables = [read_detector(path, cache) for path in sorted(glob.glob(os.path.join(directory, "e1Detector_*.xml")))]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def read_full_output(path="data/results.xml", kind="vehicle", cache=True):
+    # one row per <kind> per step of a full-output, with a timestep column.
+    # kind is vehicle, person, lane (with the edge's lanes and their emissions, occupancy, ...) or trafficlight
+    return cached(path, kind, lambda: read_table(path, (kind,), timestep=True), cache)
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser(usage="%prog [options] file.xml")
+    optParser.add_option("--kind", default=None,
+                         help="full-output rows: vehicle, person, lane or trafficlight (default vehicle)")
+    optParser.add_option("--persons", action="store_true", default=False, help="personinfo rows of a tripinfo file")
+    optParser.add_option("--no-cache", action="store_true", default=False)
+    options, args = optParser.parse_args()
+    if len(args) != 1:
+        optParser.error("give one sumo output file")
+
+    path = args[0]
+    with open(path) as f:
+        head = f.read(4096)
+    if "<tripinfos" in head:
+        table = read_tripinfo(path, options.persons, not options.no_cache)
+    elif "<detector" in head or "e1Detector" in os.path.basename(path):
+        table = read_detector(path, not options.no_cache)
+    else:
+        table = read_full_output(path, options.kind or "vehicle", not options.no_cache)
+    print(table)
+    print(table.describe())
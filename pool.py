@@ -0,0 +1,149 @@
+import os
+import time
+import shutil
+import optparse
+import tempfile
+import subprocess
+import multiprocessing
+import multiprocessing.util
+
+from runner import checkBinary, traci, algorithm, fixed  # runner sets up the SUMO_HOME path
+from sweep import CFG, sumo_command, quiet
+from sumolib.miscutils import getFreeSocketPort  # noqa
+
+# warm sumo workers: every worker process keeps one sumo running and the next run resets it with
+# traci.load (same command line with the run's seed / route file), instead of starting sumo again
+# and waiting for its port. sumo is checked before every run (one getTime round-trip) and started
+# again when it doesn't answer, when a run failed in it, or every --recycle runs, so a leak or a bad
+# state in one sumo doesn't last.
+#
+# the controllers close their conn at the end, they get a Lease on the worker's conn where close()
+# does nothing.
+#
+# python pool.py --controller fixed --seeds 0,1,2,3,4,5,6,7 --jobs 4 --recycle 3
+
+RECYCLE = 50    # runs per sumo before it's started again
+CONTROLLERS = {"algorithm": algorithm, "fixed": fixed}
+
+
+class Lease:
+    # the worker's conn for one run, close() leaves sumo running
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def close(self):
+        pass
+
+
+class Worker:
+    def __init__(self, label, cfg=CFG, recycle=RECYCLE):
+        self.label = label
+        self.cfg = cfg
+        self.recycle = recycle
+        self.outdir = tempfile.mkdtemp(prefix=label + "-")    # detector files, see sweep.sumo_command
+        self.conn = None
+        self.runs = 0       # runs in this sumo
+        self.starts = 0     # sumo processes started
+
+    def options(self, seed, routes=None, options=()):
+        # sumo's command line without the binary, what traci.load takes
+        return sumo_command(self.cfg, seed, self.outdir, routes)[1:] + list(options)
+
+    def healthy(self):
+        if self.conn is None:
+            return False
+        try:
+            self.conn.simulation.getTime()
+            return True
+        except (traci.exceptions.FatalTraCIError, traci.exceptions.TraCIException, OSError):
+            return False
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def reset(self, seed, routes=None, options=()):
+        # a sumo at step 0 with this seed and routes, loaded into the running one if it's fine
+        if self.runs >= self.recycle or not self.healthy():
+            self.stop()
+        if self.conn is None:
+            label = "{0}-{1}".format(self.label, self.starts)
+            traci.start([checkBinary('sumo')] + self.options(seed, routes, options), port=getFreeSocketPort(),
+                        label=label, stdout=subprocess.DEVNULL)
+            self.conn = traci.getConnection(label)
+            self.starts += 1
+            self.runs = 0
+        else:
+            self.conn.load(self.options(seed, routes, options))
+        self.runs += 1
+        return Lease(self.conn)
+
+    def shutdown(self):
+        self.stop()
+        shutil.rmtree(self.outdir, ignore_errors=True)
+
+
+WORKER = None   # the Worker of this pool process
+
+
+def init(cfg=CFG, recycle=RECYCLE):
+    global WORKER
+    quiet()
+    WORKER = Worker("pool-{0}".format(os.getpid()), cfg, recycle)
+    # runs when the pool is closed and joined (not on terminate)
+    multiprocessing.util.Finalize(WORKER, WORKER.shutdown, exitpriority=10)
+
+
+def run(job):
+    # job is (controller name, seed, route file or None, keyword args for the controller),
+    # returns (job, averages, seconds to get sumo ready). a run that fails is tried once more in a new sumo
+    controller, seed, routes, args = job
+    for attempt in range(2):
+        start = time.perf_counter()
+        conn = WORKER.reset(seed, routes)
+        ready = time.perf_counter() - start
+        try:
+            return job, CONTROLLERS[controller](conn=conn, output=None, **args), ready
+        except (traci.exceptions.FatalTraCIError, traci.exceptions.TraCIException, OSError):
+            WORKER.stop()
+            if attempt == 1:
+                raise
+
+
+def warm_pool(jobs=None, cfg=CFG, recycle=RECYCLE):
+    # close() and join() it when done, so the workers stop their sumo
+    return multiprocessing.Pool(jobs, initializer=init, initargs=(cfg, recycle))
+
+
+if __name__ == "__main__":
+    optParser = optparse.OptionParser()
+    optParser.add_option("--controller", default="fixed", choices=sorted(CONTROLLERS))
+    optParser.add_option("--seeds", default="0,1,2,3,4,5,6,7", help="comma separated sumo seeds, one run each")
+    optParser.add_option("--routes", default=None, help="route file instead of the one in the config")
+    optParser.add_option("--demand", default=None, help="or a demand spec for demand.py (json or a json file)")
+    optParser.add_option("--jobs", type="int", default=None, help="worker processes (default: all cores)")
+    optParser.add_option("--recycle", type="int", default=RECYCLE, help="runs per sumo before it's started again")
+    options, args = optParser.parse_args()
+
+    routes = options.routes
+    if options.demand is not None:
+        from demand import route_file, parse_spec
+        routes = route_file(parse_spec(options.demand))
+    jobs = [(options.controller, int(seed), routes, {}) for seed in options.seeds.split(",")]
+    pool = warm_pool(options.jobs, recycle=options.recycle)
+    start = time.perf_counter()
+    ready = []
+    for job, averages, seconds in pool.imap_unordered(run, jobs):
+        ready.append(seconds)
+        print(job[1], averages, "ready in {0:.3f} s".format(seconds))
+    pool.close()
+    pool.join()
+    print("{0} runs in {1:.1f} s, sumo ready in {2:.3f} s on average (first start {3:.3f} s)".format(
+        len(jobs), time.perf_counter() - start, sum(ready) / len(ready), max(ready)))
@@ -0,0 +1,121 @@
+import time
+import cProfile
+import pstats
+import functools
+
+import numpy as np
+
+# opt-in timers for a run of runner.algorithm() (python runner.py --nogui --profile), to see where a step goes:
+# sumo's simulationStep, the traci calls (per domain and method), algo() and the Metrics writer.
+#
+# instrument() swaps the functions for wrappers that add the time of every call (perf_counter_ns) to a list,
+# ~0.3 us per call, the originals are put back by restore(). the time between two simulationStep calls is one
+# step of the controller, report() prints its p50/p99 and a histogram and the share of every timed function.
+# with --cprofile file.prof the whole run also goes through cProfile, the file opens in snakeviz and
+# `flameprof file.prof > flame.svg` makes a flamegraph of it.
+#
+# python runner.py --nogui --profile --cprofile results/runner.prof
+
+DOMAINS = ("simulation", "lane", "trafficlight", "inductionloop", "vehicle", "person", "edge")
+BUCKETS = [0, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, np.inf]   # us, step histogram
+
+
+class Profiler:
+    def __init__(self, cprofile=None):
+        # cprofile is the file for the cProfile stats, None doesn't run cProfile
+        self.times = {}     # name -> [ns per call]
+        self.steps = []     # ns at the start of every simulationStep
+        self.wrapped = []   # (owner, attribute, original) for restore()
+        self.cprofile = cprofile
+        self.profile = None
+        self.start = None
+
+    def wrap(self, owner, attribute, name=None):
+        # replaces owner.attribute (module, object or class) with a timed version of it
+        original = getattr(owner, attribute)
+        times = self.times.setdefault(name or attribute, [])
+        clock = time.perf_counter_ns
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                times.append(clock() - start)
+
+        setattr(owner, attribute, timed)
+        self.wrapped.append((owner, attribute, original))
+        return timed
+
+    def instrument(self, conn, functions=()):
+        # conn is the traci module or a connection, functions are extra (owner, attribute) pairs like (runner, "algo")
+        step = conn.simulationStep
+        steps = self.steps
+        clock = time.perf_counter_ns
+
+        def marked(*args, **kwargs):
+            steps.append(clock())
+            return step(*args, **kwargs)
+
+        conn.simulationStep = marked
+        self.wrapped.append((conn, "simulationStep", step))
+        self.wrap(conn, "simulationStep", "traci.simulationStep")
+
+        for domain in DOMAINS:
+            owner = getattr(conn, domain, None)
+            if owner is None:
+                continue
+            for attribute in dir(owner):
+                if not attribute.startswith("_") and callable(getattr(owner, attribute)):
+                    self.wrap(owner, attribute, "traci.{0}.{1}".format(domain, attribute))
+
+        for owner, attribute in functions:
+            self.wrap(owner, attribute, "{0}.{1}".format(getattr(owner, "__name__", type(owner).__name__), attribute))
+
+        self.start = time.perf_counter_ns()
+        if self.cprofile is not None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def restore(self):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.cprofile)
+        for owner, attribute, original in reversed(self.wrapped):
+            setattr(owner, attribute, original)
+        self.wrapped = []
+
+    def step_times(self):
+        # us per controller step, from one simulationStep to the next
+        return np.diff(np.array(self.steps, dtype=np.int64)) / 1000
+
+    def table(self):
+        # (name, calls, total ms, mean us, p50 us, p99 us) of every function that was called, most time first
+        rows = []
+        for name, times in self.times.items():
+            if times:
+                times = np.array(times) / 1000
+                rows.append((name, len(times), times.sum() / 1000, times.mean(), np.percentile(times, 50), np.percentile(times, 99)))
+        return sorted(rows, key=lambda row: -row[2])
+
+    def report(self, top=20):
+        self.restore()
+        wall = (time.perf_counter_ns() - self.start) / 1e6
+        steps = self.step_times()
+        if len(steps):
+            print("{0} steps, {1:.0f} ms, per step p50 {2:.1f} us, p99 {3:.1f} us, max {4:.1f} us".format(
+                len(steps), wall, np.percentile(steps, 50), np.percentile(steps, 99), steps.max()))
+            counts, edges = np.histogram(steps, BUCKETS)
+            for count, low, high in zip(counts, edges[:-1], edges[1:]):
+                if count:
+                    print("  {0:>6.0f} - {1:<6.0f} us {2:>6} {3}".format(low, high, count, "#" * int(np.ceil(50 * count / counts.max()))))
+
+        print("{0:<45} {1:>7} {2:>10} {3:>6} {4:>9} {5:>9} {6:>9}".format("", "calls", "total ms", "%", "mean us", "p50 us", "p99 us"))
+        for name, calls, total, mean, p50, p99 in self.table()[:top]:
+            print("{0:<45} {1:>7} {2:>10.1f} {3:>6.1f} {4:>9.1f} {5:>9.1f} {6:>9.1f}".format(
+                name, calls, total, 100 * total / wall, mean, p50, p99))
+
+        if self.cprofile is not None:
+            print("cProfile stats in {0}".format(self.cprofile))
+            pstats.Stats(self.cprofile).sort_stats("cumulative").print_stats(top)
@@ -10,97 +10,125 @@ import random
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
     sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
 
-from sumolib import checkBinary  # noqa
-import traci  # noqa
+# the pip packages work without SUMO_HOME (e.g. faketraci.py needs no sumo). no sys.exit here, runner gets
+# imported by the other scripts and by the worker mode, an ImportError is for them to deal with
+try:
+    from sumolib import checkBinary  # noqa
+    import traci  # noqa
+except ImportError:
+    raise ImportError("please declare environment variable 'SUMO_HOME' (or pip install sumolib traci)")
 
 def get_options():
     optParser = optparse.OptionParser()
     optParser.add_option("--nogui", action="store_true",
                          default=False, help="run the commandline version of sumo")
+    optParser.add_option("--format", default="csv", choices=FORMATS,
+                         help="file format for the per-step results: csv, npy or parquet")
+    optParser.add_option("--mpc", action="store_true", default=False,
+                         help="decide with the queue model rollout of mpc.py, its decisions go to results/mpc.csv")
+    optParser.add_option("--adaptive", action="store_true", default=False,
+                         help="decide when the e1 detectors or the max green timer say so (cadence.py), not every 47 steps")
+    optParser.add_option("--profile", action="store_true", default=False,
+                         help="time simulationStep, the traci calls, algo() and the metrics writer and print the breakdown (profiler.py)")
+    optParser.add_option("--cprofile", default=None,
+                         help="also run under cProfile and dump the stats to this file (implies --profile)")
+    optParser.add_option("--backend", default="traci", choices=backend.BACKENDS,
+                         help="traci (sumo over a socket) or libsumo (sumo in this process, --nogui only), see backend.py")
+    optParser.add_option("--demand", default=None,
+                         help="route file from this demand spec (json or a json file) instead of T.rou.xml, see demand.py")
+    optParser.add_option("--worker", action="store_true", default=False,
+                         help="persistent worker: json jobs on stdin, one json result per line on stdout (see serve)")
     options, args = optParser.parse_args()
     return options
 
 # everything above this is just for the purposes of setting up and for the sake of not breaking everything
 
 import csv
-import pandas as pd
 
-def algorithm():
+import backend
+from junction import load_junction
+from metrics import Metrics, FORMATS
+from telemetry import Telemetry, NUMBER, WAITING, total, green_duration
+
+# mpc.py, cadence.py and snapshot.py are imported where they're used, a plain run doesn't load them.
+# python bench_import.py checks the import time of runner against its budget
+
+NET = "data/T.net.xml"
+CFG = "data/T.sumocfg"
+
+def algorithm(net=NET, A=1, B=1, C=1, min=47, conn=traci, output="results/dataalgo", format="csv", resume=None, checkpoint=None, mpc=None, cadence=None):
+    # A, B, C are the score weights (see algo), min is how many steps between decisions.
+    # conn is the traci module or a labelled connection, output=None doesn't write the result files.
+    # returns the averages that go in dataalgoave.csv
+    # resume is a Snapshot (see snapshot.py) to carry on from instead of step 0, the output file then only
+    # has the steps after it but the averages are still over the whole run. with checkpoint=(step, statefile)
+    # the run stops at that step, saves sumo's state and returns a Snapshot instead (see fork.py).
+    # mpc is an MPC (see mpc.py) that makes the decisions instead of algo() and green_duration()
+    # cadence is a Cadence (see cadence.py) that says when to decide, instead of every min steps
     step = 0
-    min = 47
     T = 3600
-    hungerlevel = [0, 0]
-    traci.trafficlight.setPhase("gneJ27", 0)
-
-    row = ["time", "waiting time", "queue length", "departure rate", "phase"]
-    rows = []
-    waitingtime, queuelength, exited = 0, 0, 0
+    junction = load_junction(net)
+    hungerlevel = [0] * len(junction.greens)
+    telemetry = Telemetry(junction, conn)
+    metrics = Metrics(output, format)
+    if resume is None:
+        conn.trafficlight.setPhase(junction.id, junction.greens[0])
+    else:
+        step, hungerlevel = resume.restore(conn, metrics)
+    telemetry.subscribe()
+    if cadence is not None:
+        cadence.subscribe()
 
     while step <= T: 
-        traci.simulationStep()
-        if step % min == 0: 
-            scores = algo(hungerlevel)
-            if traci.trafficlight.getPhase("gneJ27") == 0: 
-                if scores[1] > scores[0]:
-                    traci.trafficlight.setPhase("gneJ27", 1)
-                    hungerlevel[0] += 5
-                    hungerlevel[1] = 0
-                else:
-                    traci.trafficlight.setPhase("gneJ27", 0)
-                    duration = int((traci.lane.getLastStepVehicleNumber("gneE20_1")*traci.lane.getLastStepLength("gneE20_1")+traci.lane.getLastStepVehicleNumber("gneE20_2")*traci.lane.getLastStepLength("gneE20_2")+traci.lane.getLastStepVehicleNumber("gneE19_1")*traci.lane.getLastStepLength("gneE19_1")+traci.lane.getLastStepVehicleNumber("gneE19_2")*traci.lane.getLastStepLength("gneE19_2"))/(traci.lane.getLastStepMeanSpeed("gneE20_1") + traci.lane.getLastStepMeanSpeed("gneE20_2") + traci.lane.getLastStepMeanSpeed("gneE19_1") + traci.lane.getLastStepMeanSpeed("gneE19_2") + 0.01))
-                    print(step, duration)
-                    traci.trafficlight.setPhaseDuration("gneJ27", duration)
-            elif traci.trafficlight.getPhase("gneJ27") == 3:
-                if scores[0] > scores[1]:
-                    traci.trafficlight.setPhase("gneJ27", 4)
-                    hungerlevel[0] = 0
-                    hungerlevel[1] += 5
-                else:
-                    traci.trafficlight.setPhase("gneJ27", 3)
-                    duration = int((traci.lane.getLastStepVehicleNumber("gneE21_1")*traci.lane.getLastStepLength("gneE21_1")+traci.lane.getLastStepVehicleNumber("gneE21_2")*traci.lane.getLastStepLength("gneE21_2"))/(traci.lane.getLastStepMeanSpeed("gneE21_1") + traci.lane.getLastStepMeanSpeed("gneE21_2") + 0.01))
-                    print(step, duration)
-                    traci.trafficlight.setPhaseDuration("gneJ27", duration)
-        waiting = traci.lane.getWaitingTime("gneE20_1") + traci.lane.getWaitingTime("gneE20_2") + traci.lane.getWaitingTime("gneE19_1") + traci.lane.getWaitingTime("gneE19_2") + traci.lane.getWaitingTime("gneE21_1") + traci.lane.getWaitingTime("gneE21_2")
-        volume = traci.lane.getLastStepVehicleNumber("gneE20_1") + traci.lane.getLastStepVehicleNumber("gneE20_2") + traci.lane.getLastStepVehicleNumber("gneE19_1") + traci.lane.getLastStepVehicleNumber("gneE19_2") + traci.lane.getLastStepVehicleNumber("gneE21_1") + traci.lane.getLastStepVehicleNumber("gneE21_2")    
-        exit = traci.simulation.getArrivedNumber()
-        data = [step, waiting / volume, volume / 6, exit, traci.trafficlight.getPhase("gneJ27")]
-        waitingtime += data[1]
-        queuelength += data[2]
-        exited += data[3]
-        rows.append(data)
+        if checkpoint is not None and step == checkpoint[0]:
+            from snapshot import save_snapshot
+            snapshot = save_snapshot(conn, checkpoint[1], step, hungerlevel, metrics)
+            metrics.close()
+            conn.close()
+            return snapshot
+        conn.simulationStep()
+        data = telemetry.read()
+        phase = data["phase"]
+        current = junction.group(phase)
+        if cadence is not None:
+            due = cadence.due(step, current)
+        else:
+            due = step % min == 0 and current >= 0
+        if due: 
+            following = (current + 1) % len(junction.greens) # the green we go to if we leave this one
+            if mpc is not None:
+                duration = mpc.decide(step, data, current) # 0 means leave now
+                leave = duration == 0
+            else:
+                scores = algo(hungerlevel, data, junction, A, B, C)
+                leave = scores[following] > scores[current]
+            if cadence is not None and cadence.forced:
+                leave = True # max green
+            if leave:
+                phase += 1
+                conn.trafficlight.setPhase(junction.id, phase)
+                hungerlevel[current] += 5
+                hungerlevel[following] = 0
+            else:
+                conn.trafficlight.setPhase(junction.id, phase)
+                if mpc is None:
+                    duration = green_duration(data, junction.groups[current])
+                print(step, duration)
+                conn.trafficlight.setPhaseDuration(junction.id, duration)
+        waiting = data["lanes"][:, WAITING].sum()
+        volume = data["lanes"][:, NUMBER].sum()
+        exit = data["arrived"]
+        metrics.append([step, waiting / volume if volume else 0.0, volume / len(junction.lanes), exit, phase])
         step += 1
-    
-    # "gneE20_1" + "gneE20_2" + "gneE19_1" + "gneE19_2": phase 0
-    # "gneE21_1" + "gneE21_2": phase 3
-
-    f1 = "results/dataalgo.csv" # for instantaneous values
-    f2 = "results/dataalgoave.csv" # for average values
-  
-    # writing to csv file
-    with open(f1, 'w') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        
-        csvwriter.writerow(row)
-        
-        csvwriter.writerows(rows)
-
-    df1 = pd.read_csv('results/dataalgo.csv')
-    df1.to_csv('results/dataalgo.csv', index=False)
-    
-    with open(f2, 'w') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        
-        csvwriter.writerow(["average waiting time", "average queue length", "average departure rate"])
-        csvwriter.writerow([waitingtime / T, queuelength / T, exited / T])
 
-    df2 = pd.read_csv('results/dataalgoave.csv')
-    df2.to_csv('results/dataalgoave.csv', index=False)
-
-    traci.close()
+    conn.close()
+    if mpc is not None:
+        mpc.close()
+    if cadence is not None:
+        cadence.close()
     sys.stdout.flush()
+    return finish(metrics, output, T)
 
 '''
 def run2(): # THIS IS THE REVISED ALGORITHM, WORK HERE! also don't forget to do run2() at the bottom
@@ -209,72 +237,98 @@ def run2(): # THIS IS THE REVISED ALGORITHM, WORK HERE! also don't forget to do
     sys.stdout.flush()
 '''
 
-def fixed(): # call for fixed-time. here, we only run this for the purposes of data collection (lmao). same datacollection process as before.
+def fixed(net=NET, conn=traci, output="results/datafixed", format="csv"): # call for fixed-time. here, we only run this for the purposes of data collection (lmao). same datacollection process as before.
     step = 0
     T = 3600
-    traci.trafficlight.setPhase("gneJ27", 0)
+    junction = load_junction(net)
+    conn.trafficlight.setPhase(junction.id, 0)
+    telemetry = Telemetry(junction, conn)
+    telemetry.subscribe()
 
-    row = ["time", "waiting time", "queue length", "departure rate", "phase"]
-    rows = []
-    waitingtime, queuelength, exited = 0, 0, 0
+    metrics = Metrics(output, format)
 
     while step <= T: 
-        traci.simulationStep()
-        waiting = traci.lane.getWaitingTime("gneE20_1") + traci.lane.getWaitingTime("gneE20_2") + traci.lane.getWaitingTime("gneE19_1") + traci.lane.getWaitingTime("gneE19_2") + traci.lane.getWaitingTime("gneE21_1") + traci.lane.getWaitingTime("gneE21_2")
-        volume = traci.lane.getLastStepVehicleNumber("gneE20_1") + traci.lane.getLastStepVehicleNumber("gneE20_2") + traci.lane.getLastStepVehicleNumber("gneE19_1") + traci.lane.getLastStepVehicleNumber("gneE19_2") + traci.lane.getLastStepVehicleNumber("gneE21_1") + traci.lane.getLastStepVehicleNumber("gneE21_2")    
-        exit = traci.simulation.getArrivedNumber()
-        data = [step, waiting / volume, volume / 6, exit, traci.trafficlight.getPhase("gneJ27")]
-        waitingtime += data[1]
-        queuelength += data[2]
-        exited += data[3]
-        rows.append(data)
+        conn.simulationStep()
+        data = telemetry.read()
+        waiting = data["lanes"][:, WAITING].sum()
+        volume = data["lanes"][:, NUMBER].sum()
+        exit = data["arrived"]
+        metrics.append([step, waiting / volume if volume else 0.0, volume / len(junction.lanes), exit, data["phase"]])
         step += 1    
-        
-    f1 = "results/datafixed.csv" # for instantaneous values
-    f2 = "results/datafixedave.csv" # for average values
-  
-    # writing to csv file
-    with open(f1, 'w') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        
-        csvwriter.writerow(row)
-        
-        csvwriter.writerows(rows)
 
-    df1 = pd.read_csv('results/datafixed.csv')
-    df1.to_csv('results/datafixed.csv', index=False)
-    
-    with open(f2, 'w') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        
-        csvwriter.writerow(["average waiting time", "average queue length", "average departure rate"])
-        csvwriter.writerow([waitingtime / T, queuelength / T, exited / T])
+    conn.close()
+    sys.stdout.flush()
+    return finish(metrics, output, T)
 
-    df2 = pd.read_csv('results/datafixedave.csv')
-    df2.to_csv('results/datafixedave.csv', index=False)
+def finish(metrics, output, T):
+    # closes the per-step file and writes the averages next to it (output + "ave.csv")
+    metrics.close()
+    averages = [float(metrics.sums[1] / T), float(metrics.sums[2] / T), metrics.sums[3] / T]
 
-    traci.close()
-    sys.stdout.flush()    
+    if output is not None:
+        with open(output + "ave.csv", 'w') as csvfile:
+            csvwriter = csv.writer(csvfile, lineterminator="\n")
+            csvwriter.writerow(["average waiting time", "average queue length", "average departure rate"])
+            csvwriter.writerow(averages)
 
-def algo(hungerlevel):
-    A = 1
-    B = 1
-    C = 1
-    scores = [] 
+    return averages
 
-    volume = traci.lane.getLastStepVehicleNumber("gneE20_1") + traci.lane.getLastStepVehicleNumber("gneE20_2") + traci.lane.getLastStepVehicleNumber("gneE19_1") + traci.lane.getLastStepVehicleNumber("gneE19_2")
-    waitingtime = traci.lane.getWaitingTime("gneE20_1") + traci.lane.getWaitingTime("gneE20_2") + traci.lane.getWaitingTime("gneE19_1") + traci.lane.getWaitingTime("gneE19_2")
-    scores.append(((A * volume / 4) + (B * waitingtime / volume) + (C * 4 * hungerlevel[0])) / 4)
+def algo(hungerlevel, data, junction, A=1, B=1, C=1):
+    scores = [] 
 
-    volume = traci.lane.getLastStepVehicleNumber("gneE21_1") + traci.lane.getLastStepVehicleNumber("gneE21_2")
-    waitingtime = traci.lane.getWaitingTime("gneE21_1") + traci.lane.getWaitingTime("gneE21_2")
-    scores.append(((A * volume / 2) + (B * waitingtime / volume) + (C * 2 * hungerlevel[1])) / 2)
+    # one score per green, n is the number of lanes it serves (4 for phase 0 and 2 for phase 3 on gneJ27)
+    for group, hunger in zip(junction.groups, hungerlevel):
+        n = len(group)
+        volume = total(data, group, NUMBER)
+        waitingtime = total(data, group, WAITING)
+        scores.append(((A * volume / n) + (B * (waitingtime / volume if volume else 0.0)) + (C * n * hunger)) / n)
 
     return scores
 
+def serve(jobs=sys.stdin, results=sys.stdout):
+    # persistent worker, one interpreter (and its imports) for many runs: python runner.py --worker < jobs > results
+    # a job is a json line like {"id": 1, "controller": "algorithm", "seed": 42, "args": {"A": 2, "min": 30}},
+    # optional "cfg", "options" (more sumo options) and "backend". args go to algorithm() / fixed(), output defaults to None.
+    # the result line is {"id": .., "averages": [..], "seconds": ..} or {"id": .., "error": ..}.
+    # what the controllers print goes to stderr so stdout only has the results
+    import json
+    import time
+    import contextlib
+
+    controllers = {"algorithm": algorithm, "fixed": fixed}
+    for line in jobs:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        start = time.perf_counter()
+        conn = traci
+        try:
+            controller = controllers[job.get("controller", "algorithm")]
+            command = [checkBinary('sumo'), "-c", job.get("cfg", CFG), "--no-step-log", "--no-warnings"]
+            if "seed" in job:
+                command += ["--seed", str(job["seed"])]
+            args = dict(job.get("args", {}))
+            args.setdefault("output", None)
+            with contextlib.redirect_stdout(sys.stderr):
+                conn = backend.start(command + job.get("options", []), job.get("backend", "traci"), quiet=True)
+                result = {"averages": controller(conn=conn, **args)}
+        except Exception as error:
+            result = {"error": repr(error)}
+            try:
+                conn.close()
+            except Exception:
+                pass
+        result["id"] = job.get("id")
+        result["seconds"] = time.perf_counter() - start
+        results.write(json.dumps(result) + "\n")
+        results.flush()
+
 # this is the main entry point of this script
 if __name__ == "__main__":
     options = get_options()
+    if options.worker:
+        serve()
+        sys.exit()
 
     # this script has been called from the command line. It will start sumo as a
     # server, then connect and run
@@ -283,11 +337,32 @@ if __name__ == "__main__":
     else:
         sumoBinary = checkBinary('sumo-gui')
 
-    # first, generate the route file for this simulation
-    # generate_routefile()
+    # first, generate the route file for this simulation (demand.py, cached per spec)
+    routes = []
+    routefile = None    # None is T.rou.xml of the config
+    if options.demand is not None:
+        from demand import route_file, parse_spec
+        routefile = route_file(parse_spec(options.demand))
+        routes = ["--route-files", routefile]
 
     # this is the normal way of using traci. sumo is started as a
     # subprocess and then the python script connects and runs
-    traci.start([sumoBinary, "-c", "data/T.sumocfg",
-                             "--tripinfo-output", "tripinfo.xml"])
-    algorithm()
\ No newline at end of file
+    conn = backend.start([sumoBinary, "-c", CFG,
+                             "--tripinfo-output", "tripinfo.xml"] + routes, options.backend)
+    mpc = None
+    if options.mpc:
+        from mpc import MPC, ROUTES
+        # the same demand as sumo, its arrival rates come from the flows of the route file
+        mpc = MPC(load_junction(NET), NET, routes=routefile or ROUTES, output="results/mpc")
+    cadence = None
+    if options.adaptive:
+        from cadence import Cadence
+        cadence = Cadence(load_junction(NET), conn=conn)
+    profiler = None
+    if options.profile or options.cprofile:
+        from profiler import Profiler
+        profiler = Profiler(options.cprofile)
+        profiler.instrument(conn, [(sys.modules[__name__], "algo"), (Metrics, "append"), (Metrics, "flush")])
+    algorithm(conn=conn, format=options.format, mpc=mpc, cadence=cadence)
+    if profiler is not None:
+        profiler.report()
\ No newline at end of file
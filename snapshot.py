@@ -0,0 +1,40 @@
+import json
+
+# checkpoint of a runner.algorithm() run: sumo's own state file (simulation.saveState) plus what
+# algorithm() keeps in python, the step, the hunger levels and the running sums of the per-step rows.
+# the phase and its remaining time are in sumo's state, the controller reads the phase back every step.
+#
+# sumo has to be started with --save-state.rng for the state to carry the random number generators,
+# otherwise a branch gets different pedestrians than the run it was forked from.
+
+class Snapshot:
+    def __init__(self, state, step, hungerlevel, sums, count):
+        self.state = state              # sumo state file
+        self.step = step                # the step algorithm() carries on with
+        self.hungerlevel = hungerlevel
+        self.sums = sums                # Metrics.sums and Metrics.count up to here
+        self.count = count
+
+    def restore(self, conn, metrics):
+        # loads the state into a sumo started with the same net and routes, returns (step, hungerlevel)
+        conn.simulation.loadState(self.state)
+        metrics.sums = list(self.sums)
+        metrics.count = self.count
+        return self.step, list(self.hungerlevel)
+
+    def write(self):
+        # the python side goes next to the state file, so a snapshot can be forked from later runs too
+        with open(self.state + ".json", "w") as f:
+            json.dump({"step": self.step, "hungerlevel": self.hungerlevel, "sums": self.sums, "count": self.count}, f)
+
+
+def save_snapshot(conn, state, step, hungerlevel, metrics):
+    # state goes to saveState as is, so sumo's --output-prefix applies to it like to any output file
+    conn.simulation.saveState(state)
+    return Snapshot(state, step, list(hungerlevel), [float(value) for value in metrics.sums], metrics.count)
+
+
+def load_snapshot(state):
+    with open(state + ".json") as f:
+        values = json.load(f)
+    return Snapshot(state, values["step"], values["hungerlevel"], values["sums"], values["count"])
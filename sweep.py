@@ -0,0 +1,144 @@
+import os
+import sys
+import shutil
+import optparse
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+
+from runner import checkBinary, traci, algorithm, NET  # runner sets up the SUMO_HOME path
+from sumolib.miscutils import getFreeSocketPort  # noqa
+
+# parameter sweep over the score weights A, B, C and the decision interval of runner.algorithm().
+# every config runs in its own headless sumo, with its own traci label and port, in a process pool.
+# --demand sweeps the demand too: route files of demand.py specs (made once, then reused from
+# data/demand) instead of T.rou.xml, the "demand" column has the route file of the point.
+#
+# python sweep.py --A 1,2 --B 1,2 --C 1 --interval 30,47,60 --seeds 0,1,2 --jobs 8
+# python sweep.py --A 1,2 --demand '[{"volume": 900}, {"volume": 1800}]'
+
+CFG = "data/T.sumocfg"
+COLUMNS = ["A", "B", "C", "interval", "seed", "demand", "average waiting time", "average queue length", "average departure rate"]
+POINT = 6   # the COLUMNS of a point, the rest are its averages
+
+
+def sumo_command(cfg, seed, outdir, routes=None):
+    # full-output is huge and nobody reads it in a sweep. the detector files go in outdir so the
+    # workers don't all write over the same data/e1Detector_*.xml. routes replaces the route file of cfg
+    prefix = os.path.relpath(outdir, os.path.dirname(cfg) or ".") + os.sep
+    command = [checkBinary('sumo'), "-c", cfg, "--seed", str(seed), "--no-step-log", "--no-warnings",
+               "--full-output", "NUL", "--output-prefix", prefix]
+    if routes is not None:
+        command += ["--route-files", os.path.abspath(routes)]
+    return command
+
+
+def run(job):
+    index, (A, B, C, interval, seed, routes) = job
+    label = "sweep-{0}".format(index)
+    outdir = tempfile.mkdtemp(prefix=label + "-")
+    try:
+        traci.start(sumo_command(CFG, seed, outdir, routes), port=getFreeSocketPort(), label=label, stdout=subprocess.DEVNULL)
+        averages = algorithm(NET, A, B, C, interval, traci.getConnection(label), output=None)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    return [A, B, C, interval, seed, routes] + averages
+
+
+def run_warm(point):
+    # the same in a warm sumo of pool.py, the pool has to be pool.warm_pool()
+    from pool import run as run_pool
+    A, B, C, interval, seed, routes = point
+    job, averages, ready = run_pool(("algorithm", seed, routes, {"net": NET, "A": A, "B": B, "C": C, "min": interval}))
+    return [A, B, C, interval, seed, routes] + averages
+
+
+def quiet():
+    # algorithm() prints every green extension, hundreds of workers doing that is just noise
+    sys.stdout = open(os.devnull, 'w')
+
+
+def point_key(point):
+    # memo.key() of a sweep point
+    from memo import key
+    A, B, C, interval, seed, routes = point
+    return key("algorithm", {"A": A, "B": B, "C": C, "min": interval}, seed, routes=routes)
+
+
+def sweep(grid, jobs=None, output="results/sweep.csv", warm=False, memo=None):
+    # warm=True keeps one sumo per worker and reloads it for every point (see pool.py)
+    # memo is a memo.Memo, the points it has aren't run again and the new ones go into it
+    grid = list(grid)
+    rows = []
+    todo = grid
+    if memo is not None:
+        keys = dict((point, point_key(point)) for point in grid)
+        todo = []
+        for point in grid:
+            averages = memo.get(keys[point])
+            if averages is None:
+                todo.append(point)
+            else:
+                rows.append(list(point) + averages)
+        print("{0}/{1} from the cache".format(len(rows), len(grid)))
+
+    if warm:
+        from pool import warm_pool
+        pool, work, function = warm_pool(jobs), todo, run_warm
+    else:
+        pool, work, function = multiprocessing.Pool(jobs, initializer=quiet), enumerate(todo), run
+    for row in pool.imap_unordered(function, work):
+        rows.append(row)
+        print("{0}/{1}".format(len(rows), len(grid)), row)
+        if memo is not None:
+            point = tuple(row[:POINT])
+            memo.put(keys[point], row[POINT:], dict(zip(COLUMNS[:POINT], point)))
+    pool.close()
+    pool.join()
+    if memo is not None:
+        memo.evict()
+
+    import pandas as pd  # only here, the workers don't need it (~180 ms of import each)
+    df = pd.DataFrame(rows, columns=COLUMNS).sort_values(COLUMNS[:POINT])
+    if output is not None:
+        df.to_csv(output, index=False)
+    return df
+
+
+def values(text, kind=float):
+    return [kind(value) for value in text.split(",")]
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--A", default="1", help="comma separated values for A")
+    optParser.add_option("--B", default="1", help="comma separated values for B")
+    optParser.add_option("--C", default="1", help="comma separated values for C")
+    optParser.add_option("--interval", default="47", help="comma separated decision intervals (steps)")
+    optParser.add_option("--seeds", default="23423", help="comma separated sumo seeds (23423 is sumo's default)")
+    optParser.add_option("--demand", default=None,
+                         help="demand.py spec or list of specs (json or a json file), one route file each instead of T.rou.xml")
+    optParser.add_option("--jobs", type="int", default=None, help="worker processes (default: all cores)")
+    optParser.add_option("--output", default="results/sweep.csv", help="merged results table")
+    optParser.add_option("--warm", action="store_true", default=False,
+                         help="reuse one sumo per worker, reset with traci.load (pool.py)")
+    optParser.add_option("--no-cache", action="store_true", default=False,
+                         help="run every point, even the ones in results/cache (memo.py)")
+    options, args = optParser.parse_args()
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    routes = [None]
+    if options.demand is not None:
+        from demand import parse_demand
+        routes = parse_demand(options.demand, options.jobs)
+    grid = itertools.product(values(options.A), values(options.B), values(options.C),
+                             values(options.interval, int), values(options.seeds, int), routes)
+    memo = None
+    if not options.no_cache:
+        from memo import Memo
+        memo = Memo()
+    print(sweep(grid, options.jobs, options.output, options.warm, memo))
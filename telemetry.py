@@ -0,0 +1,47 @@
+import numpy as np
+
+import traci  # noqa
+import traci.constants as tc  # noqa
+
+# lane telemetry for the controller and the data collection.
+# instead of asking sumo for every value with a separate getter (one socket round-trip each),
+# we subscribe once and sumo sends everything back together with the simulationStep reply.
+
+LANE_VARS = (tc.LAST_STEP_VEHICLE_NUMBER, tc.LAST_STEP_LENGTH, tc.LAST_STEP_MEAN_SPEED, tc.VAR_WAITING_TIME)
+
+# columns of data["lanes"], same order as LANE_VARS
+NUMBER, LENGTH, SPEED, WAITING = range(4)
+
+
+class Telemetry:
+    def __init__(self, junction, conn=traci):
+        self.junction = junction  # see junction.py, rows of data["lanes"] follow junction.lanes
+        self.conn = conn          # the traci module or a labelled traci connection
+
+    def subscribe(self):
+        # has to be called once before the first simulationStep
+        for lane in self.junction.lanes:
+            self.conn.lane.subscribe(lane, LANE_VARS)
+        self.conn.trafficlight.subscribe(self.junction.id, (tc.TL_CURRENT_PHASE,))
+        self.conn.simulation.subscribe((tc.VAR_ARRIVED_VEHICLES_NUMBER,))
+
+    def read(self):
+        # one dict per step: {"phase": .., "arrived": .., "lanes": array of lanes x LANE_VARS}
+        # these are cached on the python side, no round-trips here
+        results = self.conn.lane.getAllSubscriptionResults()
+        return {
+            "phase": self.conn.trafficlight.getSubscriptionResults(self.junction.id)[tc.TL_CURRENT_PHASE],
+            "arrived": self.conn.simulation.getSubscriptionResults()[tc.VAR_ARRIVED_VEHICLES_NUMBER],
+            "lanes": np.array([[results[lane][var] for var in LANE_VARS] for lane in self.junction.lanes], dtype=float),
+        }
+
+
+def total(data, group, var):
+    # sum of one variable over a group of lanes (an index array from junction.groups)
+    return data["lanes"][group, var].sum()
+
+
+def green_duration(data, group):
+    # t = l / v, see README (0.01 so we don't divide by zero)
+    lanes = data["lanes"][group]
+    return int((lanes[:, NUMBER] * lanes[:, LENGTH]).sum() / (lanes[:, SPEED].sum() + 0.01))